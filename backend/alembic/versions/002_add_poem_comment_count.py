@@ -0,0 +1,17 @@
+"""add poem comment_count
+
+Revision ID: 002
+Revises: 001
+"""
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('poems', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=True))
+    op.execute(
+        "UPDATE poems SET comment_count = "
+        "(SELECT COUNT(*) FROM comments WHERE comments.poem_id = poems.id)"
+    )
+
+def downgrade():
+    op.drop_column('poems', 'comment_count')
@@ -0,0 +1,14 @@
+"""chat index on (sender_id, receiver_id, created_at)
+
+Revision ID: 003
+Revises: 002
+"""
+from alembic import op
+
+def upgrade():
+    op.create_index('idx_chat_between_created', 'chat_messages', ['sender_id', 'receiver_id', 'created_at'])
+    op.drop_index('idx_chat_between', table_name='chat_messages')
+
+def downgrade():
+    op.create_index('idx_chat_between', 'chat_messages', ['sender_id', 'receiver_id'])
+    op.drop_index('idx_chat_between_created', table_name='chat_messages')
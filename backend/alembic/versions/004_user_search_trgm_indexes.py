@@ -0,0 +1,20 @@
+"""pg_trgm indexes for user search
+
+Revision ID: 004
+Revises: 003
+"""
+from alembic import op
+
+def upgrade():
+    # Trigram indexes only exist on PostgreSQL; other databases use the in-memory index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_user_username_trgm ON users USING gin (username gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_user_name_trgm ON users USING gin (name gin_trgm_ops)")
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS idx_user_name_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_user_username_trgm")
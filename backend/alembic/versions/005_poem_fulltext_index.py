@@ -0,0 +1,23 @@
+"""poem full-text search index
+
+Revision ID: 005
+Revises: 004
+"""
+from alembic import op
+
+# Keep in sync with POEM_SEARCH_DOCUMENT in app/models.py
+POEM_SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', content), 'B'))"
+)
+
+def upgrade():
+    # Only PostgreSQL has tsvector; other databases use the in-memory BM25 index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS idx_poem_fts ON poems USING gin ({POEM_SEARCH_DOCUMENT})")
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS idx_poem_fts")
@@ -0,0 +1,12 @@
+"""poem_tags (tag_id, poem_id) index
+
+Revision ID: 006
+Revises: 005
+"""
+from alembic import op
+
+def upgrade():
+    op.create_index('idx_poem_tags_tag_poem', 'poem_tags', ['tag_id', 'poem_id'])
+
+def downgrade():
+    op.drop_index('idx_poem_tags_tag_poem', table_name='poem_tags')
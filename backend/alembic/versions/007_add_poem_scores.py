@@ -0,0 +1,20 @@
+"""add poem_scores for trending
+
+Revision ID: 007
+Revises: 006
+"""
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table(
+        'poem_scores',
+        sa.Column('poem_id', sa.Integer(), sa.ForeignKey('poems.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('epoch', sa.Integer(), nullable=False),
+    )
+    op.create_index('idx_poem_score_epoch', 'poem_scores', ['epoch', 'score'])
+
+def downgrade():
+    op.drop_index('idx_poem_score_epoch', table_name='poem_scores')
+    op.drop_table('poem_scores')
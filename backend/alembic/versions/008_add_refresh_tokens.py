@@ -0,0 +1,45 @@
+"""add refresh tokens and access-token revocation
+
+Revision ID: 008
+Revises: 007
+
+Without alembic, run python -m scripts.add_tokens_valid_after_column instead
+(create_all adds the tables but not the users column).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('users', sa.Column('tokens_valid_after', sa.DateTime(), nullable=True))
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('token_hash', sa.String(64), nullable=False),
+        sa.Column('family_id', sa.String(32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_refresh_tokens_id', 'refresh_tokens', ['id'])
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True)
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'])
+    op.create_index('idx_refresh_user_revoked', 'refresh_tokens', ['user_id', 'revoked_at'])
+    op.create_index('idx_refresh_expires', 'refresh_tokens', ['expires_at'])
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('jti', sa.String(32), primary_key=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
+    op.drop_index('idx_refresh_expires', table_name='refresh_tokens')
+    op.drop_index('idx_refresh_user_revoked', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_token_hash', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_id', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
+    op.drop_column('users', 'tokens_valid_after')
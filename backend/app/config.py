@@ -18,8 +18,32 @@ class Settings(BaseSettings):
     
     # JWT authentication
     SECRET_KEY: str = os.getenv("SECRET_KEY", "replace_this_with_a_random_secret")
-    ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")  # HS256 (SECRET_KEY) or RS256/ES256 (key pair below)
+    JWT_PRIVATE_KEY: str = os.getenv("JWT_PRIVATE_KEY", "")  # PEM; or a path in JWT_PRIVATE_KEY_FILE
+    JWT_PRIVATE_KEY_FILE: str = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+    JWT_PUBLIC_KEY: str = os.getenv("JWT_PUBLIC_KEY", "")  # Derived from the private key if unset
+    JWT_PUBLIC_KEY_FILE: str = os.getenv("JWT_PUBLIC_KEY_FILE", "")
+    JWT_KEY_ID: str = os.getenv("JWT_KEY_ID", "")  # "kid" header, for key rotation
+    VERIFIED_TOKEN_CACHE_SIZE: int = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))  # Short-lived; clients renew via /auth/refresh
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    TOKEN_REVOCATION_SYNC_SECONDS: int = int(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))  # Picks up other workers' logouts
+    
+    # Password hashing (bcrypt runs in a dedicated, bounded thread pool)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Existing hashes are upgraded on login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # Beyond this, auth returns 503
+    
+    # Auth rate limits (sliding window per IP and per account); store: "memory" or "redis" (uses REDIS_URL)
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "memory").lower()
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # In-memory store, LRU-evicted
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"  # Use X-Forwarded-For (set true behind Railway/Render)
+    LOGIN_RATE_LIMIT_PER_IP: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30"))
+    LOGIN_RATE_LIMIT_PER_ACCOUNT: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_ACCOUNT", "10"))
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "300"))
+    FORGOT_PASSWORD_RATE_LIMIT_PER_IP: int = int(os.getenv("FORGOT_PASSWORD_RATE_LIMIT_PER_IP", "10"))
+    FORGOT_PASSWORD_RATE_LIMIT_PER_ACCOUNT: int = int(os.getenv("FORGOT_PASSWORD_RATE_LIMIT_PER_ACCOUNT", "3"))
+    FORGOT_PASSWORD_RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("FORGOT_PASSWORD_RATE_LIMIT_WINDOW_SECONDS", "3600"))
     
     # RAG (AI poem generation) configuration
     RAG_PERSIST_DIR: str = os.getenv("RAG_PERSIST_DIR", str(Path(__file__).parent.parent / "poem_chroma_bge_db"))
@@ -38,6 +62,51 @@ class Settings(BaseSettings):
     FROM_EMAIL: str = os.getenv("FROM_EMAIL", "noreply@rhymebox.com")
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
     
+    # Caching: "memory" (per process) or "redis" (shared between workers)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory").lower()
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))  # Entries per in-memory response cache
+    FEED_CACHE_TTL: int = int(os.getenv("FEED_CACHE_TTL", "30"))  # Seconds a public feed page is served from cache
+    
+    # Real-time chat: "memory" (single worker) or "redis" (pub/sub across workers, uses REDIS_URL)
+    CHAT_BROKER: str = os.getenv("CHAT_BROKER", "memory").lower()
+    CHAT_RETENTION_HOURS: int = int(os.getenv("CHAT_RETENTION_HOURS", "24"))  # Messages older than this are hidden and pruned
+    CHAT_RETENTION_BATCH_SIZE: int = int(os.getenv("CHAT_RETENTION_BATCH_SIZE", "1000"))  # Rows deleted per transaction
+    CHAT_RETENTION_INTERVAL_SECONDS: int = int(os.getenv("CHAT_RETENTION_INTERVAL_SECONDS", "3600"))
+    
+    # Friendship graph cache (per-process; TTL bounds staleness across workers)
+    FRIEND_GRAPH_CACHE_USERS: int = int(os.getenv("FRIEND_GRAPH_CACHE_USERS", "5000"))
+    FRIEND_GRAPH_TTL: int = int(os.getenv("FRIEND_GRAPH_TTL", "60"))
+    
+    # Authenticated-user cache (per-process; TTL bounds staleness across workers)
+    PRINCIPAL_CACHE_USERS: int = int(os.getenv("PRINCIPAL_CACHE_USERS", "10000"))
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+    
+    # Friend suggestions (friends-of-friends by mutual count), refreshed in the background
+    SUGGESTIONS_CACHE_USERS: int = int(os.getenv("SUGGESTIONS_CACHE_USERS", "1000"))
+    SUGGESTIONS_TTL: int = int(os.getenv("SUGGESTIONS_TTL", "1800"))  # Idle users age out after this
+    SUGGESTIONS_REFRESH_SECONDS: int = int(os.getenv("SUGGESTIONS_REFRESH_SECONDS", "600"))
+    SUGGESTIONS_MAX_CANDIDATES: int = int(os.getenv("SUGGESTIONS_MAX_CANDIDATES", "50"))
+    
+    # In-memory search indexes (used when not on PostgreSQL); rebuilt to pick up other workers' writes
+    USER_SEARCH_REBUILD_SECONDS: int = int(os.getenv("USER_SEARCH_REBUILD_SECONDS", "300"))
+    POEM_SEARCH_REBUILD_SECONDS: int = int(os.getenv("POEM_SEARCH_REBUILD_SECONDS", "300"))  # Same, for the BM25 poem index
+    
+    # Trending: decayed activity scores (half-life), rebased into a new epoch window periodically
+    TRENDING_HALF_LIFE_HOURS: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+    TRENDING_EPOCH_HOURS: int = int(os.getenv("TRENDING_EPOCH_HOURS", "24"))
+    TRENDING_REBASE_SECONDS: int = int(os.getenv("TRENDING_REBASE_SECONDS", "600"))
+    
+    # Home timeline (fan-out-on-write) cache
+    TIMELINE_CACHE_USERS: int = int(os.getenv("TIMELINE_CACHE_USERS", "1000"))  # Timelines kept in memory
+    TIMELINE_MAX_LENGTH: int = int(os.getenv("TIMELINE_MAX_LENGTH", "200"))  # Newest entries cached per user
+    TIMELINE_CACHE_TTL: int = int(os.getenv("TIMELINE_CACHE_TTL", "60"))  # Seconds before a cached timeline is reloaded
+    
+    # Like counters: buffer like_count deltas in memory and flush in batches
+    LIKE_COUNTER_BUFFERED: bool = os.getenv("LIKE_COUNTER_BUFFERED", "false").lower() == "true"
+    LIKE_COUNTER_FLUSH_SECONDS: float = float(os.getenv("LIKE_COUNTER_FLUSH_SECONDS", "2"))
+    LIKE_COUNTER_MAX_PENDING: int = int(os.getenv("LIKE_COUNTER_MAX_PENDING", "500"))  # Poems pending before a forced flush
+    
     # Environment detection
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
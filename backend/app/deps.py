@@ -5,13 +5,44 @@ Handles JWT token validation and user authentication.
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.database import get_db
 from app.models import User
+from app.utils.auth_tokens import is_token_revoked
+from app.utils.principal_cache import Principal, principal_cache
 from app.utils.security import decode_access_token
 
 # OAuth2 scheme for JWT token extraction from Authorization header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
+# Same scheme, but a missing Authorization header yields None instead of 401
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
+
+def _claims_from_token(token: str) -> dict:
+    """Decode the JWT and return its claims (with a username), or raise 401."""
+    try:
+        payload = decode_access_token(token)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Could not validate credentials: {str(e)}"
+        )
+    username = payload.get("sub") or payload.get("username")
+    if not username:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials: no username in token"
+        )
+    payload["username"] = username
+    return payload
+
+def _reject_revoked(payload: dict, tokens_valid_after) -> None:
+    if is_token_revoked(payload, tokens_valid_after):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """
     Validates JWT token and returns the authenticated user.
@@ -26,32 +57,50 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     Raises:
         HTTPException: If token is invalid or user doesn't exist
     """
+    payload = _claims_from_token(token)
+    
+    # ✅ Served from the principal cache when possible (no query on a hit)
     try:
-        # Decode JWT token to extract username
-        payload = decode_access_token(token)
-        username = payload.get("sub") or payload.get("username")
-        
-        if not username:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials: no username in token"
-            )
-        
-        # Fetch user from database
-        user = db.query(User).filter(User.username == username).first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        return user
-        
-    except HTTPException:
-        raise
+        user = principal_cache.get_user(db, payload["username"])
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Could not validate credentials: {str(e)}"
         )
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    
+    _reject_revoked(payload, user.tokens_valid_after)
+    return user
+
+def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Like get_current_user, for routes that only read the user's own fields
+    (id, username, ...). Needs no database session: cache hits never touch
+    the database, misses use a short-lived one.
+    """
+    payload = _claims_from_token(token)
+    principal = principal_cache.get_principal(payload["username"])
+    if not principal:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    _reject_revoked(payload, principal.tokens_valid_after)
+    return principal
+
+def get_optional_user(token: Optional[str] = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)) -> Optional[User]:
+    """
+    Like get_current_user, but for endpoints that also serve anonymous users.
+    Returns None when no token is sent or the token is invalid.
+    """
+    if not token:
+        return None
+    try:
+        return get_current_user(token, db)
+    except HTTPException:
+        return None
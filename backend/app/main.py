@@ -3,13 +3,21 @@ from app.database import engine, Base
 from app.config import settings
 from .routes import router as api_router
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
-# ✅ COMMENT OUT: slowapi (optional production feature)
-# from slowapi import Limiter, _rate_limit_exceeded_handler
-# from slowapi.util import get_remote_address
-# from slowapi.errors import RateLimitExceeded
+from app.scheduler.periodic import register_periodic_task, start_periodic_tasks, stop_periodic_tasks
+from app.utils.like_counter import like_counter_buffer
+from app.utils.chat_hub import chat_hub
+from app.scheduler.chat_retention import prune_chat_messages, retention_stats
+from app.utils.friend_suggestions import friend_suggestions
+from app.utils.user_search import user_search_index
+from app.utils.poem_search import poem_search_index
+from app.utils.tag_catalog import load_tag_catalog
+from app.utils.jwt_keys import load_jwt_keys
+from app.utils.auth_tokens import revocation_list
+from app.utils.trending import run_rebase as rebase_trending_scores
+from app.utils.password_hasher import PasswordHasherBusy, password_hasher
 import logging
 import time
 
@@ -45,12 +53,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],  # Pagination + conditional GET validator
 )
 
-# ✅ COMMENT OUT: Rate limiter (optional)
-# limiter = Limiter(key_func=get_remote_address)
-# app.state.limiter = limiter
-# app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# ✅ Background tasks (run on daemon threads for the life of the app)
+if settings.LIKE_COUNTER_BUFFERED:
+    register_periodic_task("like-counter-flush", settings.LIKE_COUNTER_FLUSH_SECONDS, like_counter_buffer.flush, final_run=True)
+register_periodic_task("chat-retention", settings.CHAT_RETENTION_INTERVAL_SECONDS, prune_chat_messages)
+register_periodic_task("friend-suggestions", settings.SUGGESTIONS_REFRESH_SECONDS, friend_suggestions.refresh)
+register_periodic_task("trending-rebase", settings.TRENDING_REBASE_SECONDS, rebase_trending_scores)
+register_periodic_task("token-revocation-sync", settings.TOKEN_REVOCATION_SYNC_SECONDS, revocation_list.sync)
+if engine.dialect.name != "postgresql":
+    register_periodic_task("user-search-index", settings.USER_SEARCH_REBUILD_SECONDS, user_search_index.rebuild)
+    register_periodic_task("poem-search-index", settings.POEM_SEARCH_REBUILD_SECONDS, poem_search_index.rebuild)
+
+@app.on_event("startup")
+def start_background_tasks():
+    load_jwt_keys()
+    revocation_list.sync()
+    load_tag_catalog()
+    start_periodic_tasks()
+    chat_hub.start()
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    chat_hub.stop()
+    stop_periodic_tasks()
+    password_hasher.shutdown()
+
+# ✅ Login storms get a fast 503 instead of queueing behind bcrypt
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # Resolve paths
 project_root = Path(__file__).resolve().parents[2]
@@ -92,7 +126,11 @@ async def serve_page(page_name: str):
 # Health check endpoint
 @app.get('/healthz')
 def healthz():
-    return {'status': 'ok'}
+    return {
+        'status': 'ok',
+        'password_hasher': password_hasher.stats(),
+        'chat_retention': dict(retention_stats),
+    }
 
 # ✅ Request logging middleware
 @app.middleware("http")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Table, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, Float, String, Text, Boolean, ForeignKey, DateTime, Table, UniqueConstraint, Index, DDL, event, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -11,7 +11,9 @@ poem_tags = Table(
     Base.metadata,
     Column("poem_id", Integer, ForeignKey("poems.id", ondelete='CASCADE'), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id", ondelete='CASCADE'), primary_key=True),
-    Column("created_at", DateTime, default=datetime.utcnow)
+    Column("created_at", DateTime, default=datetime.utcnow),
+    # Reverse of the (poem_id, tag_id) primary key: walks a tag's poems in id order
+    Index('idx_poem_tags_tag_poem', 'tag_id', 'poem_id'),
 )
 
 # ===== MAIN TABLES =====
@@ -47,6 +49,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
+    tokens_valid_after = Column(DateTime, nullable=True)  # Access tokens issued before this are revoked
     
     # Relationships
     poems = relationship("Poem", back_populates="user", cascade="all, delete-orphan")
@@ -56,8 +59,24 @@ class User(Base):
     __table_args__ = (
         Index('idx_user_username_email', 'username', 'email'),
         Index('idx_user_created', 'created_at'),
+        # ✅ Trigram indexes for ILIKE '%q%' user search (PostgreSQL only)
+        Index('idx_user_username_trgm', 'username', postgresql_using='gin',
+              postgresql_ops={'username': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_user_name_trgm', 'name', postgresql_using='gin',
+              postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
     )
 
+# pg_trgm must exist before the trigram indexes are created
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+# Full-text search document for poems (PostgreSQL). Queries must use this
+# exact expression so the planner matches idx_poem_fts.
+POEM_SEARCH_TS_CONFIG = "english"
+POEM_SEARCH_DOCUMENT = (
+    f"(setweight(to_tsvector('{POEM_SEARCH_TS_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{POEM_SEARCH_TS_CONFIG}', content), 'B'))"
+)
+
 class Poem(Base):
     __tablename__ = "poems"
     
@@ -76,6 +95,7 @@ class Poem(Base):
     # Stats
     view_count = Column(Integer, default=0)
     like_count = Column(Integer, default=0)
+    comment_count = Column(Integer, default=0, server_default="0")  # Maintained by add/delete_comment
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -90,6 +110,8 @@ class Poem(Base):
         Index('idx_poem_user_public', 'user_id', 'is_public'),
         Index('idx_poem_category_created', 'category', 'created_at'),
         Index('idx_poem_title', 'title'),
+        # ✅ Full-text search (PostgreSQL only; other databases use the in-memory index)
+        Index('idx_poem_fts', text(POEM_SEARCH_DOCUMENT), postgresql_using='gin').ddl_if(dialect='postgresql'),
     )
 
 class Tag(Base):
@@ -247,7 +269,36 @@ class ChatMessage(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     __table_args__ = (
-        Index('idx_chat_between', 'sender_id', 'receiver_id'),
+        # Serves both directions of a conversation plus the time window
+        Index('idx_chat_between_created', 'sender_id', 'receiver_id', 'created_at'),
+    )
+
+class TimelineEntry(Base):
+    """Fan-out-on-write home timeline: one row per (reader, poem)."""
+    __tablename__ = "timeline_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), nullable=False)  # Timeline owner
+    poem_id = Column(Integer, ForeignKey("poems.id", ondelete='CASCADE'), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)  # Copy of the poem's created_at
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'poem_id', name='_timeline_user_poem_uc'),
+        Index('idx_timeline_user_created', 'user_id', 'created_at', 'poem_id'),
+        Index('idx_timeline_author', 'author_id'),
+    )
+
+class PoemScore(Base):
+    """Trending score per poem, relative to `epoch` (see app/utils/trending.py)."""
+    __tablename__ = "poem_scores"
+
+    poem_id = Column(Integer, ForeignKey("poems.id", ondelete='CASCADE'), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+    epoch = Column(Integer, nullable=False)  # Unix time the score is relative to
+
+    __table_args__ = (
+        Index('idx_poem_score_epoch', 'epoch', 'score'),
     )
 
 class PasswordResetToken(Base):
@@ -264,6 +315,30 @@ class PasswordResetToken(Base):
         Index('idx_token_expires', 'token', 'expires_at'),
     )
 
+class RefreshToken(Base):
+    """Opaque refresh token, stored hashed and rotated on every use."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), nullable=False)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # sha256 hex
+    family_id = Column(String(32), nullable=False, index=True)  # Every rotation of one login
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_refresh_user_revoked', 'user_id', 'revoked_at'),
+        Index('idx_refresh_expires', 'expires_at'),
+    )
+
+class RevokedToken(Base):
+    """Revoked access-token ids (jti), kept until the token would have expired."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 # ✅ Verify these indexes exist (already in your code):
 # - idx_user_username_email on users(username, email)
 # - idx_poem_user_public on poems(user_id, is_public)
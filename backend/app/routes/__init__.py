@@ -5,6 +5,7 @@ from .profile import router as profile_router
 from .friends import router as friends_router
 from .daily_poem import router as daily_router
 from .users import router as users_router  # ✅ ADD THIS
+from .tags import router as tags_router
 
 router = APIRouter()
 
@@ -15,3 +16,4 @@ router.include_router(profile_router, prefix="/profile", tags=["profile"])
 router.include_router(friends_router, prefix="/friends", tags=["friends"])
 router.include_router(daily_router, prefix="/daily", tags=["daily"])  # ✅ Added
 router.include_router(users_router, prefix="/users", tags=["users"])  # ✅ ADD THIS
+router.include_router(tags_router, prefix="/tags", tags=["tags"])
@@ -1,11 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas import UserCreate, Token
+from app.schemas import UserCreate, Token, RefreshRequest
 from app.models import User, PasswordResetToken
-from app.utils.security import get_password_hash, verify_password, create_access_token
-from app.deps import get_current_user
+from app.utils.security import create_access_token, decode_access_token
+from app.utils.jwt_keys import get_jwt_keys
+from app.utils.password_hasher import PasswordHasherBusy, password_hasher
+from app.utils.principal_cache import principal_cache
+from app.utils.rate_limit import forgot_password_rate_limit, login_rate_limit
+from app.utils.user_search import index_user
+from app.utils.auth_tokens import (
+    InvalidRefreshToken, revocation_list, revoke_all_user_tokens, revoke_refresh_token,
+    issue_refresh_token, rotate_refresh_token,
+)
+from app.deps import get_current_user, oauth2_scheme
 from datetime import timedelta, datetime
+from typing import Optional
 from pydantic import BaseModel, EmailStr
 from app.config import settings
 import secrets
@@ -43,33 +54,57 @@ def send_password_reset_email(email: str, reset_link: str):
 
 router = APIRouter()
 
-@router.post("/signup", response_model=Token)
-def signup(payload: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == payload.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(User).filter(User.username == payload.username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    
-    user = User(
-        name=payload.name,
-        username=payload.username,
-        email=payload.email,
-        password_hash=get_password_hash(payload.password),
-        profile_tag = f"@{payload.username}"
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    
-    # ✅ Use configured token expiration
-    token = create_access_token(
+# ✅ Handlers that hash passwords are async so they can await the bcrypt pool;
+# their (blocking) database work runs via run_in_threadpool, off the event loop.
+
+def token_response(user: User, refresh_token: str) -> dict:
+    """A fresh short-lived access token alongside the given refresh token."""
+    access_token = create_access_token(
         {"sub": user.username},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    return {"access_token": token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def issue_tokens(db: Session, user: User) -> dict:
+    """Access token plus the refresh token of a new login. Commits."""
+    refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
+    return token_response(user, refresh_token)
+
+@router.post("/signup", response_model=Token)
+async def signup(payload: UserCreate, db: Session = Depends(get_db)):
+    def check_available():
+        if db.query(User).filter(User.email == payload.email).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+        if db.query(User).filter(User.username == payload.username).first():
+            raise HTTPException(status_code=400, detail="Username already taken")
+    
+    await run_in_threadpool(check_available)
+    password_hash = await password_hasher.hash(payload.password)
+    
+    def create_user():
+        user = User(
+            name=payload.name,
+            username=payload.username,
+            email=payload.email,
+            password_hash=password_hash,
+            profile_tag = f"@{payload.username}"
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        index_user(user)
+        return issue_tokens(db, user)
+    
+    return await run_in_threadpool(create_user)
 
-@router.post('/token', response_model=Token)
-def login_for_token(form_data: dict, db: Session = Depends(get_db)):
+@router.post('/token', response_model=Token, dependencies=[Depends(login_rate_limit)])
+async def login_for_token(form_data: dict, db: Session = Depends(get_db)):
     """Login endpoint - returns JWT token."""
     
     print(f"\n{'='*60}")
@@ -89,9 +124,11 @@ def login_for_token(form_data: dict, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Username/email and password required")
         
         # Find user
-        user = db.query(User).filter(
-            (User.username == username_or_email) | (User.email == username_or_email)
-        ).first()
+        user = await run_in_threadpool(
+            lambda: db.query(User).filter(
+                (User.username == username_or_email) | (User.email == username_or_email)
+            ).first()
+        )
         
         if not user:
             print(f"❌ User not found: {username_or_email}")
@@ -100,24 +137,31 @@ def login_for_token(form_data: dict, db: Session = Depends(get_db)):
         print(f"✅ User found: {user.username}")
         
         # Verify password
-        if not verify_password(password, user.password_hash):
+        if not await password_hasher.verify(password, user.password_hash):
             print(f"❌ Password incorrect")
             raise HTTPException(status_code=401, detail="Invalid username/email or password")
         
         print(f"✅ Password verified")
         
-        # Create token
-        token = create_access_token(
-            {"sub": user.username},
-            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        )
+        # ✅ Upgrade hashes made with a different BCRYPT_ROUNDS
+        new_hash = await password_hasher.rehash_if_needed(password, user.password_hash)
+        
+        def complete_login():
+            if new_hash:
+                user.password_hash = new_hash
+                db.commit()
+                principal_cache.invalidate(user.username)
+            # Create access + refresh tokens
+            return issue_tokens(db, user)
+        
+        tokens = await run_in_threadpool(complete_login)
         
         print(f"✅ Token generated successfully")
         print(f"{'='*60}\n")
         
-        return {"access_token": token, "token_type": "bearer"}
+        return tokens
         
-    except HTTPException:
+    except (HTTPException, PasswordHasherBusy):
         raise
     except Exception as e:
         print(f"❌ Unexpected error during login: {e}")
@@ -137,7 +181,7 @@ class ChangeEmailRequest(BaseModel):
     password: str
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -149,7 +193,7 @@ def change_password(
     print(f"{'='*60}")
     
     # Verify current password
-    if not verify_password(payload.current_password, current_user.password_hash):
+    if not await password_hasher.verify(payload.current_password, current_user.password_hash):
         print(f"❌ Current password incorrect")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -167,74 +211,82 @@ def change_password(
     # ✅ Update password with explicit commit
     try:
         old_hash = current_user.password_hash
-        new_hash = get_password_hash(payload.new_password)
+        new_hash = await password_hasher.hash(payload.new_password)
         
         print(f"Updating password hash...")
-        current_user.password_hash = new_hash
         
-        # ✅ Flush changes to database
-        db.flush()
+        def save_password():
+            current_user.password_hash = new_hash
+            
+            # ✅ Sign out every other session: old access and refresh tokens stop working
+            revoke_all_user_tokens(db, current_user)
+            
+            # ✅ Flush changes to database
+            db.flush()
+            
+            # ✅ Commit transaction
+            db.commit()
+            
+            # ✅ Refresh user to ensure we have latest data
+            db.refresh(current_user)
+            principal_cache.invalidate(current_user.username)
         
-        # ✅ Commit transaction
-        db.commit()
-        
-        # ✅ Refresh user to ensure we have latest data
-        db.refresh(current_user)
+        await run_in_threadpool(save_password)
         
         # ✅ Verify the new password works
-        verify_test = verify_password(payload.new_password, current_user.password_hash)
+        verify_test = await password_hasher.verify(payload.new_password, current_user.password_hash)
         print(f"✅ New password verification: {verify_test}")
         
         if not verify_test:
-            db.rollback()
+            await run_in_threadpool(db.rollback)
             raise HTTPException(status_code=500, detail="Password verification failed after save")
         
-        # ✅ Generate new token with extended expiration
-        new_token = create_access_token(
-            {"sub": current_user.username},
-            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        )
+        # ✅ Fresh tokens for this session (issued after the revocation cutoff)
+        tokens = await run_in_threadpool(issue_tokens, db, current_user)
         
         print(f"✅ Password changed and new token generated")
         print(f"{'='*60}\n")
         
-        return {
-            "message": "Password changed successfully",
-            "access_token": new_token,
-            "token_type": "bearer"
-        }
+        return {"message": "Password changed successfully", **tokens}
         
+    except PasswordHasherBusy:
+        await run_in_threadpool(db.rollback)
+        raise
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to change password: {str(e)}")
 
 @router.post("/change-email")
-def change_email(
+async def change_email(
     payload: ChangeEmailRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Change user email."""
     
-    if not verify_password(payload.password, current_user.password_hash):
+    if not await password_hasher.verify(payload.password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Password is incorrect"
         )
     
-    existing_user = db.query(User).filter(User.email == payload.new_email).first()
-    if existing_user and existing_user.id != current_user.id:
-        raise HTTPException(status_code=400, detail="Email already registered to another account")
+    def save_email():
+        existing_user = db.query(User).filter(User.email == payload.new_email).first()
+        if existing_user and existing_user.id != current_user.id:
+            raise HTTPException(status_code=400, detail="Email already registered to another account")
+        
+        current_user.email = payload.new_email
+        db.commit()
+        principal_cache.invalidate(current_user.username)
     
-    current_user.email = payload.new_email
-    db.commit()
+    await run_in_threadpool(save_email)
     
     return {"message": "Email changed successfully", "new_email": payload.new_email}
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(forgot_password_rate_limit)])
 def forgot_password(payload: dict, db: Session = Depends(get_db)):
     """Request password reset token."""
     
@@ -293,7 +345,7 @@ def forgot_password(payload: dict, db: Session = Depends(get_db)):
     }
 
 @router.post("/reset-password")
-def reset_password(payload: dict, db: Session = Depends(get_db)):
+async def reset_password(payload: dict, db: Session = Depends(get_db)):
     """Reset password using token."""
     
     token = payload.get('token')
@@ -307,23 +359,27 @@ def reset_password(payload: dict, db: Session = Depends(get_db)):
     print(f"{'='*60}")
     print(f"Token: {token[:10]}...")
     
-    # Find valid token
-    reset_token = db.query(PasswordResetToken).filter(
-        PasswordResetToken.token == token,
-        PasswordResetToken.used == False,
-        PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not reset_token:
-        print(f"❌ Invalid or expired token")
-        raise HTTPException(status_code=400, detail="Invalid or expired reset token")
-    
-    # Find user
-    user = db.query(User).filter(User.id == reset_token.user_id).first()
+    def load_reset_target():
+        # Find valid token
+        reset_token = db.query(PasswordResetToken).filter(
+            PasswordResetToken.token == token,
+            PasswordResetToken.used == False,
+            PasswordResetToken.expires_at > datetime.utcnow()
+        ).first()
+        
+        if not reset_token:
+            print(f"❌ Invalid or expired token")
+            raise HTTPException(status_code=400, detail="Invalid or expired reset token")
+        
+        # Find user
+        user = db.query(User).filter(User.id == reset_token.user_id).first()
+        
+        if not user:
+            print(f"❌ User not found")
+            raise HTTPException(status_code=404, detail="User not found")
+        return reset_token, user
     
-    if not user:
-        print(f"❌ User not found")
-        raise HTTPException(status_code=404, detail="User not found")
+    reset_token, user = await run_in_threadpool(load_reset_target)
     
     print(f"✅ Valid token for user: {user.username}")
     
@@ -335,15 +391,64 @@ def reset_password(payload: dict, db: Session = Depends(get_db)):
     if not any(c.isdigit() for c in new_password):
         raise HTTPException(status_code=400, detail="Password must contain a number")
     
-    # Update password
-    user.password_hash = get_password_hash(new_password)
+    new_hash = await password_hasher.hash(new_password)
     
-    # Mark token as used
-    reset_token.used = True
+    def save_password():
+        # Update password
+        user.password_hash = new_hash
+        
+        # Mark token as used
+        reset_token.used = True
+        
+        # Sign out every existing session
+        revoke_all_user_tokens(db, user)
+        
+        db.commit()
+        principal_cache.invalidate(user.username)
     
-    db.commit()
+    await run_in_threadpool(save_password)
     
     print(f"✅ Password reset successfully for {user.username}")
     print(f"{'='*60}\n")
     
     return {"message": "Password reset successfully"}
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new access token; the refresh token is rotated."""
+    try:
+        user_id, refresh_token = rotate_refresh_token(db, payload.refresh_token)
+    except InvalidRefreshToken as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    
+    return token_response(user, refresh_token)
+
+@router.post("/logout")
+def logout(
+    payload: Optional[RefreshRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Revoke this session: the presented access token and its refresh-token family."""
+    try:
+        claims = decode_access_token(token)
+    except Exception:
+        claims = {}  # Already invalid; still revoke the refresh token
+    
+    if claims.get("jti") and claims.get("exp"):
+        revocation_list.revoke(db, claims["jti"], claims["exp"])
+    if payload:
+        revoke_refresh_token(db, payload.refresh_token)
+    db.commit()
+    
+    return {"message": "Logged out"}
+
+# ✅ Public verification keys, so other services can validate tokens statelessly
+@router.get("/jwks")
+def jwks():
+    """JWK Set for RS256/ES256 deployments (empty under HS256)."""
+    return get_jwt_keys().jwks()
@@ -1,16 +1,17 @@
 # Poem of the Day routes
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from datetime import date, datetime
 from app.database import get_db
 from app.models import DailyPoem
 from app.scheduler.daily_task import generate_daily_poem, get_theme_for_date
+from app.utils.http_cache import make_etag, not_modified, set_validators
 
 router = APIRouter()
 
 @router.get("/{date_str}")
-def get_daily_poem(date_str: str, db: Session = Depends(get_db)):
+def get_daily_poem(date_str: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get the daily poem for a specific date (format: YYYY-MM-DD)."""
     try:
         target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -21,6 +22,13 @@ def get_daily_poem(date_str: str, db: Session = Depends(get_db)):
     daily_poem = db.query(DailyPoem).filter(DailyPoem.date == date_str).first()
     
     if daily_poem:
+        # ✅ Conditional GET: regenerating a day rewrites title/content
+        etag = make_etag(daily_poem.id, daily_poem.theme, daily_poem.title, daily_poem.content)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        set_validators(response, etag)
+        
         return {
             'date': daily_poem.date,
             'theme': daily_poem.theme,
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status as http_status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_  # ✅ ADD IMPORT
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
+from app.config import settings
 from app.database import get_db
 from app.models import Friend, User, ChatMessage
 from app.deps import get_current_user
+from app.utils.security import decode_access_token
+from app.utils.timeline import backfill_author, remove_author
+from app.utils.chat_hub import chat_hub
+from app.utils.friend_graph import friend_graph
+from app.utils.friend_suggestions import friend_suggestions
+from app.utils.principal_cache import principal_cache
+from app.utils.auth_tokens import is_token_revoked
+from app.utils.user_search import search_users as find_users
 
 router = APIRouter()
 
@@ -32,72 +42,93 @@ def follow(payload: dict, db: Session = Depends(get_db), current_user = Depends(
         existing.status = "pending"
         existing.created_at = datetime.utcnow()
         db.commit()
+        friend_suggestions.invalidate(current_user.id, friend.id)
         return {"status":"pending", "detail":"Friend request re-sent"}
 
     fr = Friend(user_id=current_user.id, friend_id=friend.id, status="pending")
     db.add(fr); db.commit(); db.refresh(fr)
+    friend_suggestions.invalidate(current_user.id, friend.id)
     return {"status":"pending", "friend_id": friend.id}
 
 # List accepted friends for current user
 @router.get('/list')
-def list_friends(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """List all accepted friends (bidirectional check)."""
+def list_friends(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    include_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    List accepted friends (bidirectional check), ordered by username.
+    Without limit every friend is returned; pass skip/limit to page.
+    With include_total=true the total friend count is sent in X-Total-Count.
+    """
     
     print(f"\n{'='*60}")
     print(f"👥 FRIENDS LIST REQUEST")
     print(f"{'='*60}")
     print(f"User: {current_user.username} (ID: {current_user.id})")
     
-    # ✅ Get friends where current_user sent the request
-    outgoing = db.query(Friend).filter(
-        Friend.user_id==current_user.id, 
-        Friend.status=="accepted"
-    ).all()
-    
-    # ✅ Get friends where current_user received the request
-    incoming = db.query(Friend).filter(
-        Friend.friend_id==current_user.id, 
-        Friend.status=="accepted"
-    ).all()
+    # ✅ Both directions, deduplicated, from the cached friendship graph
+    friend_ids = friend_graph.friend_ids(db, current_user.id)
     
-    print(f"Outgoing friendships: {len(outgoing)}")
-    print(f"Incoming friendships: {len(incoming)}")
+    print(f"Total unique friends: {len(friend_ids)}")
     
-    # ✅ Combine both directions and deduplicate
-    friend_ids = set()
-    for r in outgoing:
-        friend_ids.add(r.friend_id)
-    for r in incoming:
-        friend_ids.add(r.user_id)
+    if include_total:
+        response.headers["X-Total-Count"] = str(len(friend_ids))
+    if not friend_ids:
+        print(f"{'='*60}\n")
+        return []
     
-    print(f"Total unique friends: {len(friend_ids)}")
+    # ✅ One query for the whole page instead of one per friend
+    query = db.query(User.username, User.profile_tag, User.name, User.profile_picture_url)\
+        .filter(User.id.in_(friend_ids))\
+        .order_by(User.username.asc())\
+        .offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
     
-    result = []
-    for friend_id in friend_ids:
-        u = db.query(User).filter(User.id==friend_id).first()
-        if u:
-            result.append({
-                "username": u.username, 
-                "profile_tag": u.profile_tag, 
-                "status": "accepted",
-                "name": u.name, 
-                "profile_picture_url": u.profile_picture_url
-            })
-            print(f"  - {u.username}")
+    result = [{
+        "username": r.username, 
+        "profile_tag": r.profile_tag, 
+        "status": "accepted",
+        "name": r.name, 
+        "profile_picture_url": r.profile_picture_url
+    } for r in rows]
     
+    print(f"Returned {len(result)} friends (skip={skip}, limit={limit})")
     print(f"{'='*60}\n")
     return result
 
 # Incoming friend requests (requests sent TO current_user)
 @router.get('/requests')
-def incoming_requests(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    rows = db.query(Friend).filter(Friend.friend_id==current_user.id, Friend.status=="pending").all()
-    result = []
-    for r in rows:
-        u = db.query(User).filter(User.id==r.user_id).first()
-        if u:
-            result.append({"username": u.username, "name": u.name, "profile_picture_url": u.profile_picture_url, "requested_at": r.created_at})
-    return result
+def incoming_requests(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    include_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Pending requests, newest first; all of them unless skip/limit page. include_total=true adds X-Total-Count."""
+    pending = db.query(Friend).filter(Friend.friend_id==current_user.id, Friend.status=="pending")
+    
+    # ✅ Requester profile joined in: one query per page
+    query = pending.join(User, User.id == Friend.user_id)\
+        .with_entities(User.username, User.name, User.profile_picture_url, Friend.created_at)\
+        .order_by(Friend.created_at.desc(), Friend.id.desc())\
+        .offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
+    
+    if include_total:
+        response.headers["X-Total-Count"] = str(pending.count())
+    
+    return [{"username": r.username, "name": r.name, "profile_picture_url": r.profile_picture_url, "requested_at": r.created_at} for r in rows]
 
 # Respond to a friend request: accept or decline
 @router.post('/respond')
@@ -176,6 +207,13 @@ def respond(payload: dict, db: Session = Depends(get_db), current_user = Depends
         print(f"✅ Verification:")
         print(f"   {requester.username} -> {current_user.username}: {'EXISTS' if check1 else 'MISSING'}")
         print(f"   {current_user.username} -> {requester.username}: {'EXISTS' if check2 else 'MISSING'}")
+        
+        friend_graph.invalidate(current_user.id, requester.id)
+        friend_suggestions.invalidate(current_user.id, requester.id)
+        
+        # ✅ Seed each timeline with the new friend's recent poems
+        backfill_author(db, current_user.id, requester.id)
+        backfill_author(db, requester.id, current_user.id)
         print(f"{'='*60}\n")
         
         return {"status":"accepted", "friend": requester.username}
@@ -190,6 +228,16 @@ def respond(payload: dict, db: Session = Depends(get_db), current_user = Depends
         
         return {"status":"declined", "friend": requester.username}
 
+# Friend-of-friend suggestions ranked by mutual friends
+@router.get('/suggestions')
+def suggestions(
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """People the user may know, best first, with their mutual-friend count."""
+    return friend_suggestions.get(db, current_user.id, limit)
+
 # Check relationship status between current_user and username
 @router.get('/status/{username}')
 def status(username: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -199,14 +247,18 @@ def status(username: str, db: Session = Depends(get_db), current_user = Depends(
     if target.id == current_user.id:
         return {"status":"self"}
 
-    # Check if current_user sent request or is friend
-    sent = db.query(Friend).filter(Friend.user_id==current_user.id, Friend.friend_id==target.id).first()
-    incoming = db.query(Friend).filter(Friend.user_id==target.id, Friend.friend_id==current_user.id).first()
+    # ✅ Friends check without a DB round trip
+    if friend_graph.are_friends(db, current_user.id, target.id):
+        return {"status":"friends", "direction":"mutual"}
+
+    # Otherwise look for a pending request in either direction (one query)
+    rows = db.query(Friend).filter(or_(
+        and_(Friend.user_id==current_user.id, Friend.friend_id==target.id),
+        and_(Friend.user_id==target.id, Friend.friend_id==current_user.id)
+    )).all()
+    sent = next((r for r in rows if r.user_id == current_user.id), None)
+    incoming = next((r for r in rows if r.user_id == target.id), None)
 
-    if sent and sent.status == "accepted":
-        return {"status":"friends", "direction":"outgoing"}
-    if incoming and incoming.status == "accepted":
-        return {"status":"friends", "direction":"incoming"}
     if sent and sent.status == "pending":
         return {"status":"pending_sent"}
     if incoming and incoming.status == "pending":
@@ -255,6 +307,14 @@ def remove_friend(payload: dict, db: Session = Depends(get_db), current_user = D
     
     db.commit()
     
+    if deleted_count:
+        friend_graph.invalidate(current_user.id, target.id)
+        friend_suggestions.invalidate(current_user.id, target.id)
+        
+        # ✅ Drop each other's poems from the fan-out timelines
+        remove_author(db, current_user.id, target.id)
+        remove_author(db, target.id, current_user.id)
+    
     print(f"✅ Removed {deleted_count} friendship relationship(s)")
     print(f"{'='*60}\n")
     
@@ -272,30 +332,99 @@ def send_message(username: str, payload: dict, db: Session = Depends(get_db), cu
     target = db.query(User).filter(User.username==username).first()
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    # verify accepted friendship (either direction)
-    accepted = db.query(Friend).filter(Friend.user_id==current_user.id, Friend.friend_id==target.id, Friend.status=="accepted").first()
-    if not accepted:
+    # verify accepted friendship (either direction, cached)
+    if not friend_graph.are_friends(db, current_user.id, target.id):
         raise HTTPException(status_code=403, detail="Can only chat with friends")
     msg = ChatMessage(sender_id=current_user.id, receiver_id=target.id, content=content)
     db.add(msg); db.commit(); db.refresh(msg)
-    return {"id": msg.id, "content": msg.content, "created_at": msg.created_at.isoformat(), "sender": current_user.username}
+    message = {"id": msg.id, "content": msg.content, "created_at": msg.created_at.isoformat(), "sender": current_user.username}
+    
+    # ✅ Push to open chat sockets (recipient + sender's other tabs)
+    chat_hub.publish([target.id, current_user.id], {**message, "type": "message", "receiver": target.username})
+    return message
 
-# Get chat messages with user for last 24 hours (both directions)
+# Get chat messages with user for the retention window (last 24 hours by default, both directions)
 @router.get('/chat/{username}')
-def get_messages(username: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+def get_messages(
+    username: str,
+    since_id: Optional[int] = Query(None, ge=0, description="Only return messages newer than this message id"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     target = db.query(User).filter(User.username==username).first()
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    # verify accepted friendship
-    accepted = db.query(Friend).filter(Friend.user_id==current_user.id, Friend.friend_id==target.id, Friend.status=="accepted").first()
-    if not accepted:
+    # verify accepted friendship (cached)
+    if not friend_graph.are_friends(db, current_user.id, target.id):
         raise HTTPException(status_code=403, detail="Can only chat with friends")
-    cutoff = datetime.utcnow() - timedelta(hours=24)
-    rows = db.query(ChatMessage).filter(
+    cutoff = datetime.utcnow() - timedelta(hours=settings.CHAT_RETENTION_HOURS)
+    query = db.query(ChatMessage).filter(
         ((ChatMessage.sender_id==current_user.id) & (ChatMessage.receiver_id==target.id)) |
         ((ChatMessage.sender_id==target.id) & (ChatMessage.receiver_id==current_user.id))
-    ).filter(ChatMessage.created_at >= cutoff).order_by(ChatMessage.created_at.asc()).all()
-    return [{"id": r.id, "sender": db.query(User).filter(User.id==r.sender_id).first().username, "content": r.content, "created_at": r.created_at.isoformat()} for r in rows]
+    ).filter(ChatMessage.created_at >= cutoff)
+    
+    # ✅ Incremental fetch: pollers only pull what they haven't seen
+    if since_id:
+        query = query.filter(ChatMessage.id > since_id)
+    
+    rows = query.order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()).all()
+    
+    # ✅ Only two participants: no per-message sender lookup
+    names = {current_user.id: current_user.username, target.id: target.username}
+    return [{"id": r.id, "sender": names.get(r.sender_id), "content": r.content, "created_at": r.created_at.isoformat()} for r in rows]
+
+def _authenticate_socket(token: str):
+    """Resolve a WebSocket's ?token= to a user id, or None. Cached principals need no session."""
+    try:
+        payload = decode_access_token(token)
+    except Exception:
+        return None
+    username = payload.get("sub") or payload.get("username")
+    if not username:
+        return None
+    principal = principal_cache.get_principal(username)
+    if not principal or is_token_revoked(payload, principal.tokens_valid_after):
+        return None
+    return principal.id
+
+# ✅ Real-time chat: server pushes new messages, so open chats don't poll
+@router.websocket('/ws')
+async def chat_socket(websocket: WebSocket, token: str = Query("")):
+    """
+    Push channel for chat. Connect with ?token=<JWT>; every message sent to
+    (or by) the user arrives as {"type": "message", ...}. Messages are still
+    sent with POST /chat/{username}; anything the client sends here is ignored.
+    """
+    user_id = await asyncio.to_thread(_authenticate_socket, token) if token else None
+    if not user_id:
+        await websocket.close(code=http_status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = chat_hub.subscribe(user_id)
+    
+    async def pump():
+        try:
+            while True:
+                await websocket.send_json(await queue.get())
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+    
+    async def drain():
+        # Detects client disconnects; inbound frames (pings) are ignored
+        try:
+            while True:
+                await websocket.receive_text()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+    
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        chat_hub.unsubscribe(user_id, queue)
 
 # ✅ NEW: Search users by username (autocomplete)
 @router.get('/search')
@@ -305,15 +434,10 @@ def search_users(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Search users by username or name (autocomplete)."""
-    
-    search_term = f"%{q}%"
+    """Search users by username or name (autocomplete), exact > prefix > substring."""
     
-    # Search by username or name, exclude current user
-    users = db.query(User).filter(
-        (User.username.ilike(search_term) | User.name.ilike(search_term)),
-        User.id != current_user.id
-    ).limit(limit).all()
+    # ✅ Indexed search (pg_trgm on Postgres, in-memory prefix index elsewhere)
+    users = find_users(db, q, limit, exclude_id=current_user.id)
     
     return [{
         "id": u.id,
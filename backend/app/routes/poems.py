@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import case, func, or_, update
 from typing import List, Optional
 from app.database import get_db
+from app.config import settings
 from app.schemas import PoemCreate, PoemOut
 from app.models import Poem, User, PoemLike, Comment
-from app.deps import get_current_user
+from app.deps import get_current_user, get_optional_user
+from app.utils.pagination import apply_keyset, split_page
+from app.utils.poem_serializer import POEM_LOAD_OPTIONS, serialize_poem, serialize_poems, get_like_status, attach_like_status
+from app.utils.timeline import fan_out_poem, read_timeline, retract_poem
+from app.utils.like_counter import record_like
+from app.utils.poem_search import search_poems, index_poem, unindex_poem
+from app.utils import trending
+from app.utils.cache import ResponseCache
+from app.utils.http_cache import make_etag, not_modified, set_validators
 from app.rag_engine.rag_poem_generator import generate_poem
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
 
 router = APIRouter()
@@ -20,22 +30,17 @@ class PoemModel(BaseModel):
     created_at: str
     tags: List[dict] = []
 
-@router.get("/", response_model=List[PoemOut])
-def list_public_poems(
-    skip: int = 0, 
-    limit: int = 50,
-    user: str = None,
-    db: Session = Depends(get_db)
-):
-    """Get all public poems for the feed - PUBLIC endpoint, no auth required"""
-    
-    print(f"\n{'='*60}")
-    print(f"📥 PUBLIC Feed request - skip: {skip}, limit: {limit}, user: {user}")
-    print(f"{'='*60}")
+# ✅ Rendered public feed pages, invalidated by create/update/delete_poem.
+# Like/comment counts inside a page may lag by up to FEED_CACHE_TTL seconds.
+public_feed_cache = ResponseCache("public-feed", ttl=settings.FEED_CACHE_TTL)
+_poem_list_adapter = TypeAdapter(List[PoemOut])
+
+def _render_public_feed(db: Session, skip: int, limit: int, user: Optional[str], cursor: Optional[str]) -> dict:
+    """Query and render one public feed page as {"body", "etag", "next_cursor"}."""
     
     # ✅ Build query with optional user filter
     # ✅ FIX: Exclude soft-deleted poems (where user_id is NULL)
-    query = db.query(Poem).filter(
+    query = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(
         Poem.is_public == True,
         Poem.user_id.isnot(None)  # Exclude soft-deleted poems
     )
@@ -46,138 +51,110 @@ def list_public_poems(
         if user_obj:
             query = query.filter(Poem.user_id == user_obj.id)
     
-    poems = query.order_by(Poem.created_at.desc()).offset(skip).limit(limit).all()
+    # ✅ Keyset pagination on (created_at, id); offset only without a cursor
+    try:
+        query = apply_keyset(query, Poem.created_at, Poem.id, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not cursor:
+        query = query.offset(skip)
+    
+    poems, next_cursor = split_page(query.limit(limit + 1).all(), limit)
     
     print(f"✅ Found {len(poems)} public poems")
     
-    # ✅ CRITICAL FIX: Build proper dict response with author username
-    result = []
-    for poem in poems:
-        # ✅ Get author username from user_id by querying User table
-        author_username = "@unknown"
-        
-        if poem.user_id:
-            # ✅ Query User table to get the username
-            author_user = db.query(User).filter(User.id == poem.user_id).first()
-            
-            if author_user:
-                author_username = f"@{author_user.username}"
-                print(f"  ✅ Poem '{poem.title}' by {author_username}")
-            else:
-                print(f"  ⚠️ Poem '{poem.title}' has user_id={poem.user_id} but USER NOT FOUND in database")
-        else:
-            print(f"  ⚠️ Poem '{poem.title}' has NO user_id (orphaned poem)")
-        
-        # ✅ Get tags for this poem
-        poem_tags_list = []
-        if poem.tags:
-            poem_tags_list = [{"id": tag.id, "name": tag.name, "category": tag.category} for tag in poem.tags]
-        
-        # ✅ Manually construct response dict (bypass Pydantic to ensure author field)
-        poem_dict = {
-            "id": poem.id,
-            "user_id": poem.user_id,
-            "title": poem.title or "Untitled",
-            "content": poem.content,
-            "is_public": poem.is_public,
-            "category": poem.category or "manual",
-            "created_at": poem.created_at,
-            "updated_at": poem.updated_at,
-            "author": author_username,  # ✅ CRITICAL: Add author field
-            "tags": poem_tags_list  # ✅ Add tags
-        }
-        
-        result.append(poem_dict)
+    # ✅ Authors and tags were eager-loaded with the page; validate so the
+    # cached body matches response_model exactly
+    rendered = _poem_list_adapter.validate_python(serialize_poems(poems))
+    body = _poem_list_adapter.dump_json(rendered).decode('utf-8')
+    return {"body": body, "etag": make_etag(body, next_cursor), "next_cursor": next_cursor}
+
+@router.get("/", response_model=List[PoemOut])
+def list_public_poems(
+    request: Request,
+    skip: int = 0, 
+    limit: int = 50,
+    user: str = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get all public poems for the feed - PUBLIC endpoint, no auth required.
     
-    print(f"📤 Returning {len(result)} poems with author info")
-    print(f"{'='*60}\n")
+    Pass `cursor` (from the X-Next-Cursor response header) for constant-time
+    infinite scroll; `skip` is still honoured when no cursor is given.
+    Pages are served from public_feed_cache when possible.
+    """
     
-    return result
+    print(f"\n{'='*60}")
+    print(f"📥 PUBLIC Feed request - skip: {skip}, limit: {limit}, user: {user}, cursor: {cursor}")
+    print(f"{'='*60}")
+    
+    page = public_feed_cache.get_or_set(
+        [skip, limit, user, cursor],
+        lambda: _render_public_feed(db, skip, limit, user, cursor)
+    )
+    
+    # ✅ Conditional GET: the ETag is computed once per cached page
+    unchanged = not_modified(request, page["etag"])
+    if unchanged:
+        return unchanged
+    
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+    response = Response(content=page["body"], media_type="application/json", headers=headers)
+    return set_validators(response, page["etag"])
 
 @router.get("/feed", response_model=dict)
 def get_personalized_feed(
-    skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get personalized feed: user's poems + friends' poems + public poems"""
+    """
+    Home timeline: the user's own poems plus public poems from accepted friends.
+    
+    Served from the fan-out timeline store (one indexed range read, usually a
+    cache hit), not a scan over the poems table. Pass the returned
+    `next_cursor` back as `cursor` to fetch the next page.
+    """
     
     print(f"\n{'='*60}")
     print(f"📥 Personalized feed for: {current_user.username}")
-    print(f"   skip: {skip}, limit: {limit}")
+    print(f"   limit: {limit}, cursor: {cursor}")
     print(f"{'='*60}")
     
-    # Get user's own poems (including private)
-    # ✅ FIX: Exclude soft-deleted poems
-    own_poems = db.query(Poem)\
-        .filter(
-            Poem.user_id == current_user.id,
-            Poem.user_id.isnot(None)  # Exclude soft-deleted
-        )\
-        .order_by(Poem.created_at.desc())\
-        .all()
-    
-    # TODO: Get friends' poems when friend system is implemented
-    # For now, just get all public poems from other users
-    # ✅ FIX: Exclude soft-deleted poems
-    public_poems = db.query(Poem)\
-        .filter(
-            Poem.is_public == True,
-            Poem.user_id != current_user.id,
-            Poem.user_id.isnot(None)  # Exclude soft-deleted
-        )\
-        .order_by(Poem.created_at.desc())\
-        .all()
+    try:
+        poem_ids, next_cursor = read_timeline(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    # Combine and sort by date
-    all_poems = own_poems + public_poems
-    all_poems.sort(key=lambda p: p.created_at, reverse=True)
+    # Re-check visibility: poems may have been deleted or made private since fan-out
+    poems_by_id = {}
+    if poem_ids:
+        poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(
+            Poem.id.in_(poem_ids),
+            Poem.user_id.isnot(None),  # Exclude soft-deleted
+            or_(Poem.user_id == current_user.id, Poem.is_public == True)
+        ).all()
+        poems_by_id = {poem.id: poem for poem in poems}
     
-    # Apply pagination
-    total_count = len(all_poems)
-    paginated_poems = all_poems[skip:skip + limit]
+    ordered = [poems_by_id[poem_id] for poem_id in poem_ids if poem_id in poems_by_id]
     
-    # Format poems with author info and tags
-    result = []
-    for poem in paginated_poems:
-        # ✅ Get tags for this poem
-        poem_tags_list = []
-        if poem.tags:
-            poem_tags_list = [{"id": tag.id, "name": tag.name, "category": tag.category} for tag in poem.tags]
-        
-        poem_dict = {
-            "id": poem.id,
-            "user_id": poem.user_id,
-            "title": poem.title or "Untitled",
-            "content": poem.content,
-            "is_public": poem.is_public,
-            "category": poem.category,
-            "created_at": poem.created_at,
-            "updated_at": poem.updated_at,
-            "author": None,
-            "is_own": poem.user_id == current_user.id,
-            "tags": poem_tags_list  # ✅ Add tags
-        }
-        
-        if poem.user_id:
-            user = db.query(User).filter(User.id == poem.user_id).first()
-            if user:
-                poem_dict["author"] = f"@{user.username}"
-        
-        result.append(poem_dict)
+    # Format poems with author info and tags (eager-loaded with the page)
+    result = serialize_poems(ordered, current_user_id=current_user.id)
     
-    has_more = (skip + limit) < total_count
+    # ✅ Embed like counts + liked flags so clients need no per-poem /likes calls
+    attach_like_status(db, result, current_user.id)
     
-    print(f"✅ Returning {len(result)} poems (total: {total_count}, has_more: {has_more})")
+    print(f"✅ Returning {len(result)} poems (has_more: {next_cursor is not None})")
     print(f"{'='*60}\n")
     
     return {
         "poems": result,
-        "total": total_count,
-        "skip": skip,
         "limit": limit,
-        "has_more": has_more
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor
     }
 
 @router.post("/create", response_model=PoemOut)
@@ -190,25 +167,102 @@ def create_poem(payload: PoemCreate, db: Session = Depends(get_db), current_user
         category = payload.category
     )
     db.add(poem); db.commit(); db.refresh(poem)
-    return poem
+    
+    # ✅ Fan out to the author's and friends' home timelines
+    fan_out_poem(db, poem)
+    public_feed_cache.invalidate()
+    index_poem(poem)
+    
+    if poem.is_public:
+        trending.bump_score(db, poem.id, trending.POST_POINTS, at=poem.created_at)
+        db.commit()
+    
+    return serialize_poem(poem)
 
 @router.get("/public", response_model=List[PoemOut])
 def list_public(db: Session = Depends(get_db)):
     # ✅ FIX: Exclude soft-deleted poems
-    poems = db.query(Poem).filter(
+    poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(
         Poem.is_public == True,
         Poem.user_id.isnot(None)
     ).order_by(Poem.created_at.desc()).all()
-    return poems
+    return serialize_poems(poems)
 
 @router.get("/mine", response_model=List[PoemOut])
 def my_poems(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     # ✅ FIX: Exclude soft-deleted poems
-    poems = db.query(Poem).filter(
+    poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(
         Poem.user_id == current_user.id,
         Poem.user_id.isnot(None)
     ).order_by(Poem.created_at.desc()).all()
-    return poems
+    return serialize_poems(poems)
+
+@router.get("/trending", response_model=dict)
+def trending_poems(
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_optional_user)
+):
+    """Hottest public poems by time-decayed likes, comments and recency."""
+    poem_ids = trending.read_trending(db, limit + 1, offset)
+    has_more = len(poem_ids) > limit
+    poem_ids = poem_ids[:limit]
+    
+    poems_by_id = {}
+    if poem_ids:
+        poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(Poem.id.in_(poem_ids)).all()
+        poems_by_id = {poem.id: poem for poem in poems}
+    
+    ordered = [poems_by_id[poem_id] for poem_id in poem_ids if poem_id in poems_by_id]
+    user_id = current_user.id if current_user else None
+    result = serialize_poems(ordered, current_user_id=user_id)
+    if user_id:
+        attach_like_status(db, result, user_id)
+    
+    return {
+        "poems": result,
+        "limit": limit,
+        "offset": offset,
+        "has_more": has_more
+    }
+
+@router.get("/search", response_model=dict)
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in title, content or tags"),
+    tag: Optional[str] = Query(None, description="Only poems with this tag"),
+    category: Optional[str] = Query(None, description="Only poems in this category (manual, ai, daily)"),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_optional_user)
+):
+    """Full-text search over public poems, most relevant first."""
+    poem_ids, total = search_poems(db, q, limit=limit, offset=offset, tag=tag, category=category)
+    
+    # Load the page in one query; re-check visibility in case the index is behind
+    poems_by_id = {}
+    if poem_ids:
+        poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(
+            Poem.id.in_(poem_ids),
+            Poem.is_public == True,
+            Poem.user_id.isnot(None)
+        ).all()
+        poems_by_id = {poem.id: poem for poem in poems}
+    
+    ordered = [poems_by_id[poem_id] for poem_id in poem_ids if poem_id in poems_by_id]
+    user_id = current_user.id if current_user else None
+    result = serialize_poems(ordered, current_user_id=user_id)
+    if user_id:
+        attach_like_status(db, result, user_id)
+    
+    return {
+        "poems": result,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": offset + len(poem_ids) < total
+    }
 
 @router.delete("/{poem_id}")
 def delete_poem(
@@ -240,8 +294,11 @@ def delete_poem(
     # Alternatively, we could hard delete with: db.delete(poem)
     poem.user_id = None
     poem.is_public = False  # Also hide it from public
+    trending.remove_score(db, poem_id)
     
     db.commit()
+    public_feed_cache.invalidate()
+    unindex_poem(poem_id)
     
     print(f"✅ Poem soft-deleted successfully (user_id set to NULL)")
     print(f"{'='*60}\n")
@@ -303,6 +360,7 @@ def update_poem(
         raise HTTPException(status_code=403, detail="You can only edit your own poems")
     
     # Update fields
+    was_public = poem.is_public
     if 'title' in payload:
         poem.title = payload['title']
     if 'content' in payload:
@@ -314,6 +372,14 @@ def update_poem(
     
     db.commit()
     db.refresh(poem)
+    public_feed_cache.invalidate()
+    index_poem(poem)
+    
+    # ✅ Keep friends' timelines in step with visibility changes
+    if poem.is_public and not was_public:
+        fan_out_poem(db, poem)
+    elif was_public and not poem.is_public:
+        retract_poem(db, poem)
     
     print(f"✅ Poem updated successfully")
     print(f"   New title: {poem.title}")
@@ -328,58 +394,72 @@ def like_poem(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Like a poem."""
+    """Like a poem, or unlike it if already liked."""
     
     # Check if poem exists
-    poem = db.query(Poem).filter(Poem.id == poem_id).first()
-    if not poem:
+    if not db.query(Poem.id).filter(Poem.id == poem_id).first():
         raise HTTPException(status_code=404, detail="Poem not found")
     
-    # Check if already liked
-    existing_like = db.query(PoemLike).filter(
-        PoemLike.user_id == current_user.id,
-        PoemLike.poem_id == poem_id
-    ).first()
+    # ✅ Insert-or-ignore / delete on the like row + atomic counter update
+    liked, delta, like_count = record_like(db, current_user.id, poem_id)
     
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        poem.like_count = max(0, poem.like_count - 1)
+    # Only a like row actually inserted or deleted moves the score
+    if delta:
+        trending.bump_score(db, poem_id, trending.LIKE_POINTS * delta)
         db.commit()
-        return {"liked": False, "like_count": poem.like_count}
-    else:
-        # Like
-        new_like = PoemLike(user_id=current_user.id, poem_id=poem_id)
-        db.add(new_like)
-        poem.like_count += 1
-        db.commit()
-        return {"liked": True, "like_count": poem.like_count}
+    
+    return {"liked": liked, "like_count": like_count}
+
+# Upper bound on ids per batch like-status request
+MAX_LIKE_BATCH = 100
+
+@router.post("/likes/batch")
+def get_likes_batch(
+    payload: dict,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_optional_user)
+):
+    """
+    Like counts and the caller's like status for many poems in one request.
+    Body: {"poem_ids": [1, 2, 3]}. Works anonymously (user_liked is then false).
+    """
+    poem_ids = payload.get("poem_ids") or []
+    if not isinstance(poem_ids, list):
+        raise HTTPException(status_code=400, detail="poem_ids must be a list")
+    if len(poem_ids) > MAX_LIKE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LIKE_BATCH} poem ids per request")
+    try:
+        poem_ids = [int(poem_id) for poem_id in poem_ids]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="poem_ids must be integers")
+    
+    status = get_like_status(db, poem_ids, current_user.id if current_user else None)
+    
+    # JSON object keys are strings
+    return {"likes": {str(poem_id): data for poem_id, data in status.items()}}
 
 @router.get("/{poem_id}/likes")
 def get_poem_likes(
     poem_id: int, 
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user) if False else None  # Optional auth
+    current_user = Depends(get_optional_user)  # Optional auth
 ):
     """Get like count and user's like status."""
     
-    poem = db.query(Poem).filter(Poem.id == poem_id).first()
-    if not poem:
+    status = get_like_status(db, [poem_id], current_user.id if current_user else None)
+    if poem_id not in status:
         raise HTTPException(status_code=404, detail="Poem not found")
     
-    # Check if current user liked this poem
-    user_liked = False
-    if current_user:
-        existing_like = db.query(PoemLike).filter(
-            PoemLike.user_id == current_user.id,
-            PoemLike.poem_id == poem_id
-        ).first()
-        user_liked = existing_like is not None
-    
-    return {
-        "like_count": poem.like_count,
-        "user_liked": user_liked
-    }
+    return status[poem_id]
+
+def _adjust_comment_count(db: Session, poem_id: int, delta: int):
+    """Atomically add delta to poems.comment_count (never below zero)."""
+    new_count = Poem.comment_count + delta
+    db.execute(
+        update(Poem)
+        .where(Poem.id == poem_id)
+        .values(comment_count=case((new_count < 0, 0), else_=new_count), updated_at=Poem.updated_at)
+    )
 
 @router.post("/{poem_id}/comment")
 def add_comment(
@@ -395,8 +475,7 @@ def add_comment(
         raise HTTPException(status_code=400, detail="Comment cannot be empty")
     
     # Check if poem exists
-    poem = db.query(Poem).filter(Poem.id == poem_id).first()
-    if not poem:
+    if not db.query(Poem.id).filter(Poem.id == poem_id).first():
         raise HTTPException(status_code=404, detail="Poem not found")
     
     # Create comment
@@ -406,6 +485,10 @@ def add_comment(
         content=content
     )
     db.add(comment)
+    
+    # ✅ Keep the denormalized count in the same transaction (atomic increment)
+    _adjust_comment_count(db, poem_id, 1)
+    trending.bump_score(db, poem_id, trending.COMMENT_POINTS)
     db.commit()
     db.refresh(comment)
     
@@ -418,24 +501,60 @@ def add_comment(
     }
 
 @router.get("/{poem_id}/comments")
-def get_comments(poem_id: int, db: Session = Depends(get_db)):
-    """Get all comments for a poem."""
+def get_comments(
+    request: Request,
+    response: Response,
+    poem_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get comments for a poem, newest first, one page at a time.
+    Pass the returned `next_cursor` back as `cursor` for older comments.
+    """
+    
+    # ✅ Cheap validator first: comments are append/delete only, so the thread
+    # changes exactly when (comment_count, newest comment id) does
+    newest_id = db.query(func.max(Comment.id)).filter(Comment.poem_id == poem_id).scalar_subquery()
+    total, last_id = db.query(Poem.comment_count, newest_id).filter(Poem.id == poem_id).first() or (0, None)
+    etag = make_etag(poem_id, total, last_id, limit, cursor)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    set_validators(response, etag)
+    
+    # ✅ Authors come from the same query (LEFT JOIN), not one lookup per comment
+    query = db.query(Comment, User.username, User.profile_picture_url, User.profile_picture)\
+        .outerjoin(User, User.id == Comment.user_id)\
+        .filter(Comment.poem_id == poem_id)
+    
+    # ✅ Keyset pagination walks idx_comment_poem_created
+    try:
+        query = apply_keyset(query, Comment.created_at, Comment.id, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    comments = db.query(Comment).filter(Comment.poem_id == poem_id).order_by(Comment.created_at.desc()).all()
+    rows, next_cursor = split_page(query.limit(limit + 1).all(), limit, key=lambda row: (row[0].created_at, row[0].id))
     
     result = []
-    for comment in comments:
-        user = db.query(User).filter(User.id == comment.user_id).first()
+    for comment, username, picture_url, picture in rows:
         result.append({
             "id": comment.id,
             "content": comment.content,
-            "author": f"@{user.username}" if user else "@unknown",
-            "author_image": user.profile_picture_url or user.image if user else None,
+            "author": f"@{username}" if username else "@unknown",
+            "author_image": picture_url or picture or None,
             "created_at": comment.created_at.isoformat(),
             "is_own": False  # Will be set by frontend
         })
     
-    return result
+    return {
+        "comments": result,
+        "total": total or 0,  # ✅ Denormalized count: no COUNT(*) over the thread
+        "limit": limit,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor
+    }
 
 @router.delete("/comments/{comment_id}")
 def delete_comment(
@@ -453,6 +572,9 @@ def delete_comment(
         raise HTTPException(status_code=403, detail="You can only delete your own comments")
     
     db.delete(comment)
+    _adjust_comment_count(db, comment.poem_id, -1)
+    # Take back exactly what the comment added (weighted at its own time)
+    trending.bump_score(db, comment.poem_id, -trending.COMMENT_POINTS, at=comment.created_at)
     db.commit()
     
     return {"message": "Comment deleted"}
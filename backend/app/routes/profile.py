@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.deps import get_current_user
+from app.deps import get_current_principal, get_current_user
 from app.schemas import UserOut
 from app.models import User  # ✅ ADD THIS IMPORT
+from app.utils.principal_cache import principal_cache
+from app.utils.user_search import index_user
 from app.utils.cloudinary_upload import upload_profile_picture, upload_banner_image, delete_image
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserOut)
-def read_me(current_user = Depends(get_current_user)):
+def read_me(current_user = Depends(get_current_principal)):
     """Get current user profile with Cloudinary URLs."""
     
     print(f"\n{'='*60}")
@@ -62,6 +64,8 @@ def update_profile(payload: dict, db: Session = Depends(get_db), current_user =
     
     db.commit()
     db.refresh(current_user)
+    principal_cache.invalidate(current_user.username)
+    index_user(current_user)
     
     print(f"✅ Profile updated successfully")
     print(f"  Username (unchanged): {current_user.username}")
@@ -124,6 +128,7 @@ async def upload_profile_pic(
         
         db.commit()
         db.refresh(current_user)
+        principal_cache.invalidate(current_user.username)
         
         return {
             "success": True,
@@ -172,6 +177,7 @@ async def upload_banner(
         
         db.commit()
         db.refresh(current_user)
+        principal_cache.invalidate(current_user.username)
         
         return {
             "success": True,
@@ -198,6 +204,7 @@ def remove_profile_picture(
     current_user.profile_picture_public_id = None
     
     db.commit()
+    principal_cache.invalidate(current_user.username)
     
     return {"success": True, "message": "Profile picture removed"}
 
@@ -216,5 +223,6 @@ def remove_banner(
     current_user.banner_image_public_id = None
     
     db.commit()
+    principal_cache.invalidate(current_user.username)
     
     return {"success": True, "message": "Banner removed"}
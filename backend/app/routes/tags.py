@@ -1,2 +1,148 @@
-# ⚠️ DELETE THIS FILE - Tag management not implemented
-# Tags are predefined in models.py and not managed via API
+"""
+Tag API: the cached tag catalog, batch attach/detach and tag-filtered feeds.
+"""
+from collections import defaultdict
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, select, tuple_
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.deps import get_current_user, get_optional_user
+from app.models import Poem, Tag, poem_tags
+from app.utils.http_cache import not_modified, set_validators
+from app.utils.poem_serializer import POEM_LOAD_OPTIONS, serialize_poems, attach_like_status
+from app.utils.poem_search import index_poem
+from app.utils.tag_catalog import get_tag_catalog, adjust_usage_counts
+from app.routes.poems import public_feed_cache
+
+router = APIRouter()
+
+MAX_TAG_BATCH_POEMS = 100
+MAX_TAG_BATCH_TAGS = 20
+
+class TagBatch(BaseModel):
+    poem_ids: List[int]
+    add: List[Union[int, str]] = []     # Tag ids or names
+    remove: List[Union[int, str]] = []
+
+@router.get("/")
+def list_tags(request: Request):
+    """The full tag catalog, grouped by category. Served from memory."""
+    catalog = get_tag_catalog()
+    unchanged = not_modified(request, catalog.etag)
+    if unchanged:
+        return unchanged
+    response = Response(content=catalog.body, media_type="application/json")
+    return set_validators(response, catalog.etag)
+
+@router.get("/popular")
+def popular_tags(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Most used tags (reads only the small tags table)."""
+    rows = db.query(Tag.id, Tag.usage_count)\
+        .filter(Tag.usage_count > 0)\
+        .order_by(Tag.usage_count.desc(), Tag.id.asc())\
+        .limit(limit).all()
+    catalog = get_tag_catalog()
+    return [{**catalog.by_id[r.id], "usage_count": r.usage_count} for r in rows if r.id in catalog.by_id]
+
+@router.post("/batch")
+def batch_tag_poems(payload: TagBatch, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """
+    Attach and/or detach tags on several of the current user's poems at once.
+    Body: {"poem_ids": [...], "add": [ids or names], "remove": [ids or names]}
+    """
+    poem_ids = list(dict.fromkeys(payload.poem_ids))
+    if not poem_ids:
+        raise HTTPException(status_code=400, detail="poem_ids required")
+    if len(poem_ids) > MAX_TAG_BATCH_POEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TAG_BATCH_POEMS} poems per request")
+    if len(payload.add) + len(payload.remove) > MAX_TAG_BATCH_TAGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TAG_BATCH_TAGS} tags per request")
+    
+    catalog = get_tag_catalog()
+    add_ids, unknown_add = catalog.resolve(payload.add)
+    remove_ids, unknown_remove = catalog.resolve(payload.remove)
+    if unknown_add or unknown_remove:
+        raise HTTPException(status_code=400, detail=f"Unknown tags: {unknown_add + unknown_remove}")
+    
+    # Verify ownership of every poem in one query
+    owned = {pid for (pid,) in db.query(Poem.id).filter(Poem.id.in_(poem_ids), Poem.user_id == current_user.id).all()}
+    if len(owned) != len(poem_ids):
+        raise HTTPException(status_code=403, detail="You can only tag your own poems")
+    
+    # Existing (poem, tag) pairs for the touched tags, read from the primary key
+    touched = set(add_ids) | set(remove_ids)
+    existing = set(db.query(poem_tags.c.poem_id, poem_tags.c.tag_id).filter(
+        poem_tags.c.poem_id.in_(poem_ids),
+        poem_tags.c.tag_id.in_(touched)
+    ).all()) if touched else set()
+    
+    deltas = defaultdict(int)
+    to_insert = [{"poem_id": pid, "tag_id": tid} for pid in poem_ids for tid in add_ids
+                 if (pid, tid) not in existing and tid not in remove_ids]
+    to_delete = [(pid, tid) for pid, tid in existing if tid in remove_ids]
+    
+    # ✅ Bulk writes: one INSERT and one DELETE for the whole batch
+    if to_insert:
+        db.execute(poem_tags.insert(), to_insert)
+        for row in to_insert:
+            deltas[row["tag_id"]] += 1
+    if to_delete:
+        db.execute(delete(poem_tags).where(tuple_(poem_tags.c.poem_id, poem_tags.c.tag_id).in_(to_delete)))
+        for _, tid in to_delete:
+            deltas[tid] -= 1
+    adjust_usage_counts(db, deltas)
+    db.commit()
+    
+    # Refresh the affected poems' tags for the response and the search index
+    poems = db.query(Poem).options(*POEM_LOAD_OPTIONS).filter(Poem.id.in_(poem_ids)).populate_existing().all()
+    if to_insert or to_delete:
+        public_feed_cache.invalidate()
+        for poem in poems:
+            index_poem(poem)
+    
+    return {
+        "added": len(to_insert),
+        "removed": len(to_delete),
+        "poems": [{"id": p.id, "tags": [dict(catalog.by_id[t.id]) for t in p.tags if t.id in catalog.by_id]} for p in poems]
+    }
+
+@router.get("/{tag_id}/poems", response_model=dict)
+def tag_feed(
+    tag_id: int,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[int] = Query(None, description="Poem id from the previous page's next_cursor"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_optional_user)
+):
+    """
+    Public poems with a tag, newest first. Walks the (tag_id, poem_id) index
+    on poem_tags and joins poems by primary key, so it never scans poems.
+    """
+    catalog = get_tag_catalog()
+    tag = catalog.by_id.get(tag_id)
+    if tag is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    
+    query = db.query(Poem).options(*POEM_LOAD_OPTIONS)\
+        .join(poem_tags, and_(poem_tags.c.poem_id == Poem.id, poem_tags.c.tag_id == tag_id))\
+        .filter(Poem.is_public == True, Poem.user_id.isnot(None))
+    if cursor:
+        query = query.filter(poem_tags.c.poem_id < cursor)
+    rows = query.order_by(poem_tags.c.poem_id.desc()).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    poems = rows[:limit]
+    user_id = current_user.id if current_user else None
+    result = serialize_poems(poems, current_user_id=user_id)
+    if user_id:
+        attach_like_status(db, result, user_id)
+    
+    return {
+        "tag": dict(tag),
+        "poems": result,
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": poems[-1].id if has_more else None
+    }
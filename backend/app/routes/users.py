@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User, Poem
 from app.schemas import UserOut
+from app.utils.http_cache import make_etag, not_modified, set_validators
 
 router = APIRouter()
 
 @router.get("/{username}", response_model=UserOut)
-def get_user_by_username(username: str, db: Session = Depends(get_db)):
+def get_user_by_username(username: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get user profile by username (public endpoint)."""
     
     print(f"\n{'='*60}")
@@ -25,6 +26,14 @@ def get_user_by_username(username: str, db: Session = Depends(get_db)):
             print(f"❌ User not found: {username}")
             raise HTTPException(status_code=404, detail="User not found")
         
+        # ✅ Conditional GET: profile changes bump updated_at
+        etag = make_etag(user.id, user.updated_at)
+        unchanged = not_modified(request, etag, user.updated_at)
+        if unchanged:
+            print(f"✅ Not modified (304)")
+            return unchanged
+        set_validators(response, etag, user.updated_at)
+        
         print(f"✅ User found:")
         print(f"   ID: {user.id}")
         print(f"   Name: {user.name}")
@@ -0,0 +1,97 @@
+"""
+Chat retention: delete ChatMessage rows older than CHAT_RETENTION_HOURS.
+
+Rows are removed in bounded batches, each in its own short transaction,
+so a large backlog never holds long locks on chat_messages.
+Runs periodically from main.py; can also be run by hand:
+    python -m app.scheduler.chat_retention
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Cumulative metrics for this process
+retention_stats = {
+    "runs": 0,
+    "total_deleted": 0,
+    "last_run_at": None,
+    "last_deleted": 0,
+    "last_batches": 0,
+    "last_duration_ms": 0,
+}
+
+def prune_chat_messages(retention_hours: Optional[int] = None, batch_size: Optional[int] = None) -> dict:
+    """
+    Delete expired chat messages in batches.
+    
+    Returns:
+        dict with the cutoff, rows deleted, batches and duration of this run
+    """
+    retention_hours = retention_hours or settings.CHAT_RETENTION_HOURS
+    batch_size = batch_size or settings.CHAT_RETENTION_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    started = time.monotonic()
+    deleted = 0
+    batches = 0
+    
+    db = SessionLocal()
+    try:
+        while True:
+            # Pick a bounded slice via the created_at index, then delete by primary key
+            ids = [row[0] for row in db.query(ChatMessage.id)
+                   .filter(ChatMessage.created_at < cutoff)
+                   .limit(batch_size)
+                   .all()]
+            if not ids:
+                break
+            
+            db.query(ChatMessage).filter(ChatMessage.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+            batches += 1
+            
+            if len(ids) < batch_size:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    
+    duration_ms = int((time.monotonic() - started) * 1000)
+    retention_stats["runs"] += 1
+    retention_stats["total_deleted"] += deleted
+    retention_stats["last_run_at"] = datetime.utcnow().isoformat()
+    retention_stats["last_deleted"] = deleted
+    retention_stats["last_batches"] = batches
+    retention_stats["last_duration_ms"] = duration_ms
+    
+    logger.info(f"Chat retention: deleted {deleted} messages older than {cutoff.isoformat()} "
+                f"in {batches} batches ({duration_ms} ms)")
+    
+    return {
+        "cutoff": cutoff.isoformat(),
+        "deleted": deleted,
+        "batches": batches,
+        "duration_ms": duration_ms,
+    }
+
+# CLI interface for manual runs
+if __name__ == "__main__":
+    import sys
+    
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    
+    print("\n" + "="*60)
+    print("🧹 CHAT RETENTION")
+    print("="*60)
+    result = prune_chat_messages(retention_hours=hours)
+    print(f"✅ Deleted {result['deleted']} messages older than {result['cutoff']}")
+    print(f"   Batches: {result['batches']}, took {result['duration_ms']} ms")
+    print("="*60 + "\n")
@@ -0,0 +1,71 @@
+"""
+Lightweight in-process periodic tasks.
+Each registered task runs on its own daemon thread for the lifetime of the
+app; main.py starts them on startup and stops them on shutdown.
+"""
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run `func` every `interval` seconds on a daemon thread.
+    With `final_run`, func also runs once more when the task is stopped
+    (e.g. to flush buffered writes on shutdown).
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object], final_run: bool = False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.final_run = final_run
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"periodic-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self.final_run:
+            self._run_once()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._run_once()
+
+    def _run_once(self) -> None:
+        try:
+            self.func()
+        except Exception as e:
+            logger.exception(f"Periodic task '{self.name}' failed: {e}")
+
+
+_tasks: Dict[str, PeriodicTask] = {}
+
+
+def register_periodic_task(name: str, interval: float, func: Callable[[], object], final_run: bool = False) -> PeriodicTask:
+    """Register a task to be started with the app. Re-registering replaces it."""
+    task = PeriodicTask(name, interval, func, final_run=final_run)
+    _tasks[name] = task
+    return task
+
+
+def start_periodic_tasks() -> None:
+    for task in _tasks.values():
+        logger.info(f"Starting periodic task '{task.name}' (every {task.interval}s)")
+        task.start()
+
+
+def stop_periodic_tasks() -> None:
+    for task in _tasks.values():
+        task.stop()
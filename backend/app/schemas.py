@@ -78,6 +78,11 @@ class UserOut(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -100,6 +105,10 @@ class PoemOut(BaseModel):
     created_at: datetime
     updated_at: datetime
     author: Optional[str] = "@unknown"  # ✅ ADD THIS: Default to @unknown if not provided
+    tags: List[dict] = []
+    like_count: int = 0
+    comment_count: int = 0
+    user_liked: bool = False
 
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
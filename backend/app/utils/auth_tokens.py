@@ -0,0 +1,176 @@
+"""
+Refresh tokens and access-token revocation.
+
+Access tokens are short-lived JWTs (ACCESS_TOKEN_EXPIRE_MINUTES) carrying a
+jti and iat. Refresh tokens are opaque random strings, stored as sha256
+hashes and rotated on every use: each login starts a "family", and
+presenting an already-rotated token revokes the whole family (it was
+stolen or replayed).
+
+An access token is revoked if either:
+  * its jti is in the revocation list (logout). The list is an in-memory
+    dict backed by the revoked_tokens table. Entries live only until their
+    token would have expired, so it stays small. sync() reloads it
+    periodically to pick up other workers' revocations.
+  * it was issued before the user's tokens_valid_after cutoff (password
+    change or reset). The cutoff is a column of the cached principal, so
+    checking it costs no query.
+"""
+import hashlib
+import logging
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import RefreshToken, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidRefreshToken(Exception):
+    """Unknown, expired, revoked or replayed refresh token."""
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _utc_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+# ===== Refresh tokens =====
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """Create a refresh token (a new family unless family_id is given). The caller commits."""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[int, str]:
+    """
+    Spend a refresh token and issue its successor. Returns (user_id, new token).
+    A token that was already spent revokes its whole family. Commits.
+    """
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash(token)).first()
+    if row is None:
+        raise InvalidRefreshToken("Invalid refresh token")
+
+    now = datetime.utcnow()
+    # Conditional update, so two concurrent uses can't both succeed
+    spent = db.query(RefreshToken)\
+        .filter(RefreshToken.id == row.id, RefreshToken.revoked_at.is_(None))\
+        .update({RefreshToken.revoked_at: now}, synchronize_session=False)
+    if not spent:
+        revoke_refresh_family(db, row.family_id)
+        db.commit()
+        logger.warning(f"Revoked refresh token presented for user {row.user_id}; revoked family {row.family_id}")
+        raise InvalidRefreshToken("Refresh token has been revoked")
+    if row.expires_at <= now:
+        db.commit()
+        raise InvalidRefreshToken("Refresh token has expired")
+
+    new_token = issue_refresh_token(db, row.user_id, row.family_id)
+    db.commit()
+    return row.user_id, new_token
+
+
+def revoke_refresh_family(db: Session, family_id: str) -> int:
+    """Revoke every live token of one login. The caller commits."""
+    return db.query(RefreshToken)\
+        .filter(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))\
+        .update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_refresh_token(db: Session, token: str) -> int:
+    """Revoke the family of a presented refresh token (logout). The caller commits."""
+    row = db.query(RefreshToken.family_id).filter(RefreshToken.token_hash == _hash(token)).first()
+    return revoke_refresh_family(db, row.family_id) if row else 0
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> int:
+    """Revoke all of a user's refresh tokens (password change). The caller commits."""
+    return db.query(RefreshToken)\
+        .filter(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))\
+        .update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_all_user_tokens(db: Session, user) -> None:
+    """
+    Log a user out everywhere: access tokens issued before now stop working
+    and refresh tokens are revoked. The caller commits (and should then
+    invalidate the principal cache).
+    """
+    # Microsecond precision, like iat: tokens minted right after this still pass,
+    # ones minted earlier in the same second don't
+    user.tokens_valid_after = datetime.utcnow()
+    revoke_user_refresh_tokens(db, user.id)
+
+
+# ===== Access-token revocation =====
+
+class RevocationList:
+    """jti -> expiry (unix time) of revoked access tokens, mirrored from revoked_tokens."""
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def revoke(self, db: Session, jti: str, exp: float) -> None:
+        """Revoke one access token until its exp. The caller commits."""
+        db.merge(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(exp)))
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def sync(self) -> dict:
+        """Prune expired rows (revoked and refresh tokens) and reload the list. Periodic-task entry point."""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            pruned = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+            pruned_refresh = db.query(RefreshToken).filter(RefreshToken.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+            rows = db.query(RevokedToken.jti, RevokedToken.expires_at).all()
+        finally:
+            db.close()
+
+        loaded = {jti: _utc_timestamp(expires_at) for jti, expires_at in rows}
+        now_ts = time.time()
+        with self._lock:
+            # Keep local revocations whose commit the reload may have missed
+            for jti, exp in self._revoked.items():
+                if exp > now_ts:
+                    loaded.setdefault(jti, exp)
+            self._revoked = loaded
+        return {"revoked": len(loaded), "pruned": pruned, "pruned_refresh": pruned_refresh}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocation_list = RevocationList()
+
+
+def is_token_revoked(payload: dict, tokens_valid_after: Optional[datetime]) -> bool:
+    """O(1) check of verified claims against the revocation list and the user's cutoff."""
+    jti = payload.get("jti")
+    if jti and revocation_list.is_revoked(jti):
+        return True
+    if tokens_valid_after is not None:
+        iat = payload.get("iat")
+        return iat is None or iat < _utc_timestamp(tokens_valid_after)
+    return False
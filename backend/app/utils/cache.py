@@ -0,0 +1,214 @@
+"""
+Caching primitives shared by the backend: an in-process LRU, pluggable
+key/value backends (in-process or Redis) and a versioned response cache.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from app.config import settings
+
+# Optional imports (only required for CACHE_BACKEND=redis)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional per-entry TTL.
+
+    Args:
+        max_size: Maximum number of entries before the least recently used is evicted
+        ttl: Seconds an entry stays valid (None = until evicted)
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def keys(self) -> list:
+        """Snapshot of the live (unexpired) keys, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (_, expires_at) in self._data.items() if expires_at is None or expires_at > now]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class CacheBackend:
+    """
+    Interface for key/value cache backends. Values must be JSON-serializable
+    so that shared backends can store them.
+    """
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter (never evicted) and return its new value."""
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process backend: bounded LRU for values, plain dict for counters."""
+
+    def __init__(self, max_size: int = 1024):
+        self._values = LRUCache(max_size=max_size)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._values.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self._values.delete(key)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared backend for multi-worker deployments (needs the redis package)."""
+
+    def __init__(self, url: str, prefix: str = "rhymebox:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package. Please pip install redis.")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+
+    def incr(self, key):
+        return int(self._client.incr(self._prefix + key))
+
+    def get_counter(self, key):
+        return int(self._client.get(self._prefix + key) or 0)
+
+
+def create_cache_backend(max_size: int = 1024) -> CacheBackend:
+    """Build the backend selected by CACHE_BACKEND ("memory" or "redis")."""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    return InMemoryCacheBackend(max_size=max_size)
+
+
+class ResponseCache:
+    """
+    Read-through cache for rendered responses.
+
+    Keys are namespaced with a generation number; invalidate() bumps the
+    generation, which orphans every older entry at once (they age out via
+    TTL/LRU). With a shared backend this invalidates all workers.
+    """
+
+    def __init__(self, namespace: str, ttl: float, backend: Optional[CacheBackend] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend or create_cache_backend(max_size=settings.RESPONSE_CACHE_SIZE)
+
+    def _key(self, parts) -> str:
+        generation = self.backend.get_counter(f"{self.namespace}:generation")
+        return f"{self.namespace}:{generation}:{json.dumps(parts, default=str)}"
+
+    def get_or_set(self, parts, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for parts, computing and storing it on a miss.
+        The generation is read before computing, so a result that raced with
+        invalidate() is stored under the old generation and never served.
+        """
+        try:
+            key = self._key(parts)
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache '{self.namespace}' read failed: {e}")
+            return compute()
+        if value is not None:
+            return value
+
+        value = compute()
+        try:
+            self.backend.set(key, value, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache '{self.namespace}' write failed: {e}")
+        return value
+
+    def invalidate(self) -> None:
+        try:
+            self.backend.incr(f"{self.namespace}:generation")
+        except Exception as e:
+            logger.warning(f"Response cache '{self.namespace}' invalidation failed: {e}")
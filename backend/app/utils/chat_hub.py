@@ -0,0 +1,173 @@
+"""
+In-process pub/sub hub that pushes chat messages to connected WebSockets.
+
+Each open socket subscribes with its user id and gets an asyncio.Queue.
+Publishing goes through a broker: the in-memory broker delivers directly
+(single worker); the Redis broker fans messages out over a pub/sub channel
+so a message sent on one worker reaches sockets held by any other.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Set, Tuple
+from app.config import settings
+
+# Optional imports (only required for CHAT_BROKER=redis)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Per-socket backlog; a client that stops reading loses messages, not memory
+SUBSCRIBER_QUEUE_SIZE = 100
+
+Deliver = Callable[[Iterable[int], dict], None]
+
+
+class ChatBroker:
+    """Interface for moving published messages to every worker's hub."""
+
+    def start(self, deliver: Deliver) -> None:
+        raise NotImplementedError
+
+    def publish(self, user_ids: Iterable[int], message: dict) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+class InMemoryChatBroker(ChatBroker):
+    """Single-process broker: delivers straight to the local hub."""
+
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, user_ids, message):
+        if self._deliver:
+            self._deliver(user_ids, message)
+
+
+class RedisChatBroker(ChatBroker):
+    """Multi-worker broker over a Redis pub/sub channel (needs the redis package)."""
+
+    def __init__(self, url: str, channel: str = "rhymebox:chat"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("CHAT_BROKER=redis requires the 'redis' package. Please pip install redis.")
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def start(self, deliver):
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+
+        def handler(raw):
+            try:
+                data = json.loads(raw["data"])
+                deliver(data["user_ids"], data["message"])
+            except Exception as e:
+                logger.warning(f"Dropped malformed chat event: {e}")
+
+        self._pubsub.subscribe(**{self._channel: handler})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, user_ids, message):
+        self._client.publish(self._channel, json.dumps({"user_ids": list(user_ids), "message": message}))
+
+    def stop(self):
+        if self._thread:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+def create_chat_broker() -> ChatBroker:
+    """Build the broker selected by CHAT_BROKER ("memory" or "redis")."""
+    if settings.CHAT_BROKER == "redis":
+        return RedisChatBroker(settings.REDIS_URL)
+    return InMemoryChatBroker()
+
+
+class ChatHub:
+    """
+    Tracks open chat sockets per user and hands them published messages.
+    publish() is safe to call from sync endpoints running in the threadpool.
+    """
+
+    def __init__(self, broker: ChatBroker):
+        self.broker = broker
+        self._subscribers: Dict[int, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        with self._lock:
+            if not self._started:
+                self.broker.start(self._deliver_local)
+                self._started = True
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._started:
+                self.broker.stop()
+                self._started = False
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a socket for user_id. Must be called from the event loop."""
+        self.start()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return
+            for entry in [s for s in subscribers if s[0] is queue]:
+                subscribers.discard(entry)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_ids: Iterable[int], message: dict) -> None:
+        """Send a message to every socket of the given users, on any worker."""
+        try:
+            self.broker.publish(list(user_ids), message)
+        except Exception as e:
+            # Clients still see the message on their next history fetch
+            logger.warning(f"Chat publish failed: {e}")
+
+    def _deliver_local(self, user_ids: Iterable[int], message: dict) -> None:
+        with self._lock:
+            targets = [entry for uid in user_ids for entry in self._subscribers.get(uid, ())]
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                pass  # Loop already closed; the socket is going away
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: dict) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Chat subscriber queue full, dropping message")
+
+
+chat_hub = ChatHub(create_chat_broker())
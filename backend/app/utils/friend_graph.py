@@ -0,0 +1,55 @@
+"""
+Cached friendship graph.
+
+Keeps each user's accepted friend ids as a frozenset in a bounded LRU, so
+"are A and B friends" is a set lookup instead of a Friend query. Entries are
+invalidated for both users whenever an accepted friendship is created or
+removed; the TTL bounds staleness for other workers, whose caches this
+process cannot invalidate.
+"""
+from typing import FrozenSet
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Friend
+from app.utils.cache import LRUCache
+
+
+def load_friend_ids(db: Session, user_id: int) -> FrozenSet[int]:
+    """Ids of accepted friends in either direction, straight from the database."""
+    rows = db.query(Friend.user_id, Friend.friend_id).filter(
+        or_(Friend.user_id == user_id, Friend.friend_id == user_id),
+        Friend.status == "accepted"
+    ).all()
+    return frozenset(friend_id if owner_id == user_id else owner_id for owner_id, friend_id in rows)
+
+
+class FriendGraph:
+    """
+    Per-user adjacency sets of the accepted-friendship graph.
+
+    Args:
+        max_users: Adjacency sets kept in memory
+        ttl: Seconds before a cached set is reloaded
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self._cache = LRUCache(max_size=max_users, ttl=ttl)
+
+    def friend_ids(self, db: Session, user_id: int) -> FrozenSet[int]:
+        ids = self._cache.get(user_id)
+        if ids is None:
+            ids = load_friend_ids(db, user_id)
+            self._cache.set(user_id, ids)
+        return ids
+
+    def are_friends(self, db: Session, user_id: int, other_id: int) -> bool:
+        return other_id in self.friend_ids(db, user_id)
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Drop cached sets; call after committing a friendship change."""
+        for user_id in user_ids:
+            self._cache.delete(user_id)
+
+
+friend_graph = FriendGraph(max_users=settings.FRIEND_GRAPH_CACHE_USERS, ttl=settings.FRIEND_GRAPH_TTL)
@@ -0,0 +1,117 @@
+"""
+Friend-of-friend suggestions ranked by mutual-friend count.
+
+Candidates for a user are computed with one SQL aggregation over accepted
+friendships and cached per user. A periodic task recomputes the cached
+entries in the background, so requests are normally served from memory;
+users who stop asking simply age out of the cache.
+"""
+import logging
+from typing import List, Tuple
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Friend, User
+from app.utils.cache import LRUCache
+from app.utils.friend_graph import friend_graph
+
+logger = logging.getLogger(__name__)
+
+
+def compute_suggestions(db: Session, user_id: int, limit: int) -> List[Tuple[int, int]]:
+    """
+    Rank friends-of-friends by mutual friends in a single query.
+    Skips the user, existing friends and anyone with a pending or blocked
+    relation in either direction (declined requests may be retried).
+
+    Returns:
+        [(candidate_id, mutual_count), ...] best first
+    """
+    accepted = Friend.status == "accepted"
+    edges = union_all(
+        select(Friend.user_id.label("a"), Friend.friend_id.label("b")).where(accepted),
+        select(Friend.friend_id.label("a"), Friend.user_id.label("b")).where(accepted),
+    ).subquery("edges")
+    mine = edges.alias("mine")
+    theirs = edges.alias("theirs")
+
+    related = union_all(
+        select(Friend.friend_id).where(Friend.user_id == user_id, Friend.status != "declined"),
+        select(Friend.user_id).where(Friend.friend_id == user_id, Friend.status != "declined"),
+    )
+
+    mutual = func.count(func.distinct(mine.c.b))
+    stmt = select(theirs.c.b, mutual)\
+        .select_from(mine.join(theirs, theirs.c.a == mine.c.b))\
+        .where(
+            mine.c.a == user_id,
+            theirs.c.b != user_id,
+            theirs.c.b.not_in(related),
+        )\
+        .group_by(theirs.c.b)\
+        .order_by(mutual.desc(), theirs.c.b.asc())\
+        .limit(limit)
+    return [(candidate_id, count) for candidate_id, count in db.execute(stmt).all()]
+
+
+class FriendSuggestions:
+    """
+    Per-user cache of precomputed suggestion lists.
+
+    Args:
+        max_users: Users whose suggestions are kept in memory
+        ttl: Seconds an entry lives without being refreshed
+        max_candidates: Candidates precomputed per user
+    """
+
+    def __init__(self, max_users: int, ttl: float, max_candidates: int):
+        self.max_candidates = max_candidates
+        self._cache = LRUCache(max_size=max_users, ttl=ttl)
+
+    def get(self, db: Session, user_id: int, limit: int) -> List[dict]:
+        ranked = self._cache.get(user_id)
+        if ranked is None:
+            ranked = compute_suggestions(db, user_id, self.max_candidates)
+            self._cache.set(user_id, ranked)
+
+        # Friendships made since the last refresh drop out without a recompute
+        friends = friend_graph.friend_ids(db, user_id)
+        ranked = [(cid, count) for cid, count in ranked if cid not in friends][:limit]
+        if not ranked:
+            return []
+
+        users = {u.id: u for u in db.query(User.id, User.username, User.name, User.profile_tag, User.profile_picture_url)
+                 .filter(User.id.in_([cid for cid, _ in ranked])).all()}
+        return [{
+            "username": users[cid].username,
+            "name": users[cid].name,
+            "profile_tag": users[cid].profile_tag,
+            "profile_picture_url": users[cid].profile_picture_url,
+            "mutual_friends": count,
+        } for cid, count in ranked if cid in users]
+
+    def invalidate(self, *user_ids: int) -> None:
+        for user_id in user_ids:
+            self._cache.delete(user_id)
+
+    def refresh(self) -> int:
+        """Recompute every cached user's suggestions. Returns the number refreshed."""
+        user_ids = self._cache.keys()
+        if not user_ids:
+            return 0
+        db = SessionLocal()
+        try:
+            for user_id in user_ids:
+                self._cache.set(user_id, compute_suggestions(db, user_id, self.max_candidates))
+        finally:
+            db.close()
+        logger.info(f"Refreshed friend suggestions for {len(user_ids)} users")
+        return len(user_ids)
+
+
+friend_suggestions = FriendSuggestions(
+    max_users=settings.SUGGESTIONS_CACHE_USERS,
+    ttl=settings.SUGGESTIONS_TTL,
+    max_candidates=settings.SUGGESTIONS_MAX_CANDIDATES,
+)
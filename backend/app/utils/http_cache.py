@@ -0,0 +1,69 @@
+"""
+HTTP validators (ETag / Last-Modified) and conditional GET support.
+
+Endpoints compute a cheap validator first (a version number, updated_at,
+max id, ...) and call not_modified() before loading or serializing the full
+payload; if the client's copy is current they answer 304 with no body.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Clients may reuse a stored copy only after revalidating it
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from any values that change whenever the payload does."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    # Naive datetimes in this app are UTC (datetime.utcnow)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def set_validators(response: Response, etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> Response:
+    """Attach ETag / Last-Modified / Cache-Control headers to a response."""
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+def not_modified(request: Request, etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Return a 304 response if the request's validators match, else None.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = bool(etag) and _etag_matches(if_none_match, etag)
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            modified = last_modified.replace(tzinfo=timezone.utc) if last_modified.tzinfo is None else last_modified
+            matched = modified.replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            matched = False
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return set_validators(Response(status_code=304), etag, last_modified)
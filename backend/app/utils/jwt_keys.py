@@ -0,0 +1,96 @@
+"""
+JWT signing and verification keys, parsed once.
+
+HS* algorithms use SECRET_KEY. RS*/ES* algorithms sign with a PEM private
+key and verify with its public key, so other services can validate tokens
+(see GET /api/auth/jwks) without holding anything that can mint them.
+Keys are loaded at startup into python-jose Key objects, so PEM parsing is
+not repeated per token.
+"""
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from jose import jwk
+from jose.backends.base import Key
+from jose.constants import ALGORITHMS
+from app.config import settings
+
+ASYMMETRIC_ALGORITHMS = ALGORITHMS.RSA_DS | ALGORITHMS.EC_DS
+SIGNING_ALGORITHMS = ALGORITHMS.HMAC | ASYMMETRIC_ALGORITHMS
+
+
+@dataclass(frozen=True)
+class JWTKeys:
+    algorithm: str
+    signing_key: Optional[Key]
+    verification_key: Key
+    key_id: Optional[str] = None
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def jwks(self) -> dict:
+        """Public JWK Set (empty for HMAC, whose key must stay secret)."""
+        if not self.asymmetric:
+            return {"keys": []}
+        public = dict(self.verification_key.to_dict(), use="sig", alg=self.algorithm)
+        if self.key_id:
+            public["kid"] = self.key_id
+        return {"keys": [public]}
+
+
+def _read_pem(value: str, path: str) -> Optional[str]:
+    if path:
+        return Path(path).read_text()
+    # Env vars often carry PEMs with escaped newlines
+    return value.replace("\\n", "\n") if value else None
+
+
+def build_jwt_keys() -> JWTKeys:
+    algorithm = settings.ALGORITHM
+    if algorithm == "EdDSA":
+        raise RuntimeError("ALGORITHM=EdDSA is not supported by python-jose; use RS256 or ES256.")
+    if algorithm not in SIGNING_ALGORITHMS:
+        raise RuntimeError(f"Unsupported JWT ALGORITHM: {algorithm}")
+
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        key = jwk.construct(settings.SECRET_KEY, algorithm)
+        return JWTKeys(algorithm=algorithm, signing_key=key, verification_key=key)
+
+    private_pem = _read_pem(settings.JWT_PRIVATE_KEY, settings.JWT_PRIVATE_KEY_FILE)
+    public_pem = _read_pem(settings.JWT_PUBLIC_KEY, settings.JWT_PUBLIC_KEY_FILE)
+    if not private_pem and not public_pem:
+        raise RuntimeError(f"ALGORITHM={algorithm} requires JWT_PRIVATE_KEY(_FILE) and/or JWT_PUBLIC_KEY(_FILE)")
+
+    # A verify-only deployment may configure just the public key
+    signing_key = jwk.construct(private_pem, algorithm) if private_pem else None
+    verification_key = jwk.construct(public_pem, algorithm) if public_pem else signing_key.public_key()
+    return JWTKeys(
+        algorithm=algorithm,
+        signing_key=signing_key,
+        verification_key=verification_key,
+        key_id=settings.JWT_KEY_ID or None,
+    )
+
+
+_keys: Optional[JWTKeys] = None
+_keys_lock = threading.Lock()
+
+
+def load_jwt_keys() -> JWTKeys:
+    """Parse the configured keys. Called at startup so bad config fails fast."""
+    global _keys
+    keys = build_jwt_keys()
+    with _keys_lock:
+        _keys = keys
+    return keys
+
+
+def get_jwt_keys() -> JWTKeys:
+    """The parsed keys (loaded on first use if startup didn't)."""
+    keys = _keys
+    if keys is None:
+        keys = load_jwt_keys()
+    return keys
@@ -0,0 +1,154 @@
+"""
+Contention-safe like toggling and like_count maintenance.
+
+Like rows are inserted with INSERT ... ON CONFLICT DO NOTHING on the
+(user_id, poem_id) unique constraint and counters change through atomic
+`UPDATE poems SET like_count = like_count + :delta`, so concurrent likes
+never lose updates. With LIKE_COUNTER_BUFFERED enabled, counter deltas are
+aggregated in memory and flushed in batches, so writers to a hot poem do not
+all queue on its row lock.
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+from sqlalchemy import bindparam, case, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import engine
+from app.models import Poem, PoemLike
+
+logger = logging.getLogger(__name__)
+
+
+def _clamped(delta):
+    """like_count + delta, never below zero."""
+    new_count = Poem.like_count + delta
+    return case((new_count < 0, 0), else_=new_count)
+
+
+def insert_like_if_absent(db: Session, user_id: int, poem_id: int) -> bool:
+    """Insert a like row unless it already exists. Returns True if inserted."""
+    values = {"user_id": user_id, "poem_id": poem_id}
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        stmt = pg_insert(PoemLike).values(**values).on_conflict_do_nothing(constraint="_user_poem_like_uc")
+        return db.execute(stmt).rowcount == 1
+    if dialect == "sqlite":
+        stmt = sqlite_insert(PoemLike).values(**values).on_conflict_do_nothing(index_elements=["user_id", "poem_id"])
+        return db.execute(stmt).rowcount == 1
+
+    # Other databases: rely on the unique constraint inside a savepoint
+    try:
+        with db.begin_nested():
+            db.add(PoemLike(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def toggle_like(db: Session, user_id: int, poem_id: int) -> Tuple[bool, int]:
+    """
+    Like the poem if the user hasn't, otherwise unlike it. Does not commit.
+
+    Returns:
+        (liked, delta): the new like state and the change to apply to like_count
+    """
+    removed = db.query(PoemLike).filter(
+        PoemLike.user_id == user_id,
+        PoemLike.poem_id == poem_id
+    ).delete(synchronize_session=False)
+    if removed:
+        return False, -1
+
+    # A concurrent request may have inserted the same like first: then it owns the +1
+    inserted = insert_like_if_absent(db, user_id, poem_id)
+    return True, 1 if inserted else 0
+
+
+def apply_like_delta(db: Session, poem_id: int, delta: int) -> int:
+    """Atomically add delta to a poem's like_count. Returns the new count."""
+    stmt = update(Poem)\
+        .where(Poem.id == poem_id)\
+        .values(like_count=_clamped(delta), updated_at=Poem.updated_at)\
+        .returning(Poem.like_count)
+    return db.execute(stmt).scalar() or 0
+
+
+class LikeCounterBuffer:
+    """
+    Aggregates like_count deltas per poem in memory and writes them with one
+    batched UPDATE. Pending deltas are lost if the process dies before a flush.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._deltas: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, poem_id: int, delta: int) -> None:
+        if not delta:
+            return
+        with self._lock:
+            self._deltas[poem_id] += delta
+            full = len(self._deltas) >= self.max_pending
+        if full:
+            self.flush()
+
+    def pending(self, poem_id: int) -> int:
+        with self._lock:
+            return self._deltas.get(poem_id, 0)
+
+    def flush(self) -> int:
+        """Write all pending deltas. Returns the number of poems updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch = [{"b_id": poem_id, "b_delta": delta} for poem_id, delta in self._deltas.items() if delta]
+                self._deltas.clear()
+            if not batch:
+                return 0
+
+            stmt = update(Poem)\
+                .where(Poem.id == bindparam("b_id"))\
+                .values(like_count=_clamped(bindparam("b_delta")), updated_at=Poem.updated_at)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(stmt, batch)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for row in batch:
+                        self._deltas[row["b_id"]] += row["b_delta"]
+                raise
+
+            logger.info(f"Flushed like counters for {len(batch)} poems")
+            return len(batch)
+
+
+like_counter_buffer = LikeCounterBuffer(max_pending=settings.LIKE_COUNTER_MAX_PENDING)
+
+
+def record_like(db: Session, user_id: int, poem_id: int) -> Tuple[bool, int, int]:
+    """
+    Toggle a like and update the poem's counter, committing the change.
+
+    Returns:
+        (liked, delta, like_count) as seen by this request; delta is 0 when a
+        concurrent request already inserted the same like
+    """
+    liked, delta = toggle_like(db, user_id, poem_id)
+
+    if settings.LIKE_COUNTER_BUFFERED:
+        db.commit()
+        like_counter_buffer.add(poem_id, delta)
+        stored = db.query(Poem.like_count).filter(Poem.id == poem_id).scalar() or 0
+        return liked, delta, max(0, stored + like_counter_buffer.pending(poem_id))
+
+    like_count = apply_like_delta(db, poem_id, delta)
+    db.commit()
+    return liked, delta, like_count
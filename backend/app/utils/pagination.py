@@ -0,0 +1,75 @@
+"""
+Keyset (cursor) pagination helpers.
+Cursors are opaque base64 strings encoding the (created_at, id) of the last
+row on a page, so the next page is a single index range scan at any depth.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, or_, func
+
+# Upper bound for "total" counts so they stay cheap on large tables
+COUNT_CAP = 1000
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_at_str, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at_str), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def apply_keyset(query, created_at_col, id_col, cursor: Optional[str]):
+    """
+    Order a query newest-first by (created_at, id) and, if a cursor is given,
+    keep only rows strictly after it.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                created_at_col < created_at,
+                and_(created_at_col == created_at, id_col < row_id)
+            )
+        )
+    return query.order_by(created_at_col.desc(), id_col.desc())
+
+
+def split_page(rows: list, limit: int, key=None):
+    """
+    Split a look-ahead result (fetched with limit + 1) into the page rows and
+    the cursor for the next page (None when there are no more rows).
+    
+    `key` maps a row to its (created_at, id) sort key; defaults to the row's
+    own created_at and id attributes.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        created_at, row_id = key(last) if key else (last.created_at, last.id)
+        return rows, encode_cursor(created_at, row_id)
+    return rows, None
+
+
+def capped_count(query, cap: int = COUNT_CAP) -> int:
+    """
+    Count the rows of a query, stopping at `cap`.
+    The database only has to walk `cap` index entries instead of the table.
+    """
+    limited = query.order_by(None).limit(cap).subquery()
+    return query.session.query(func.count()).select_from(limited).scalar()
@@ -0,0 +1,109 @@
+"""
+Bounded worker pool for bcrypt.
+
+Hashing and verifying a password takes hundreds of milliseconds of CPU on
+purpose. Run inline, a burst of logins occupies the request threadpool and
+starves every other endpoint. Auth routes instead await this pool: bcrypt
+releases the GIL, so a small dedicated thread pool runs hashes in parallel
+while the event loop keeps serving. Work beyond max_pending is rejected with
+PasswordHasherBusy (mapped to 503) instead of queueing without bound.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from app.config import settings
+from app.utils.security import get_password_hash, password_needs_rehash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should retry later."""
+
+
+class PasswordHasher:
+    """
+    Async facade over a size-capped bcrypt thread pool.
+
+    Args:
+        workers: Threads hashing concurrently
+        max_pending: Jobs allowed in flight or queued before rejecting
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._peak_pending = 0
+
+    def _timed(self, func: Callable, *args):
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._busy_seconds += elapsed
+
+    async def _submit(self, func: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                logger.warning(f"Password hashing queue full ({self._pending} pending), rejecting request")
+                raise PasswordHasherBusy("Too many authentication requests in progress, please retry shortly")
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def rehash_if_needed(self, plain_password: str, hashed_password: str):
+        """New hash if hashed_password uses a different cost than BCRYPT_ROUNDS, else None."""
+        if not password_needs_rehash(hashed_password):
+            return None
+        try:
+            return await self.hash(plain_password)
+        except PasswordHasherBusy:
+            return None  # Upgrade on a quieter login
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "queued": max(self._pending - self._running, 0),
+                "running": self._running,
+                "peak_pending": self._peak_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_ms": round(self._busy_seconds / self._completed * 1000, 1) if self._completed else 0.0,
+                "rounds": settings.BCRYPT_ROUNDS,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,217 @@
+"""
+Full-text search over public poems (title, content and tag names).
+
+On PostgreSQL matching runs against a GIN index on a weighted tsvector
+expression (title A, content B; idx_poem_fts) and results are ranked
+with ts_rank. Other databases (SQLite locally) use an in-memory inverted
+index scored with BM25. It is kept in sync from create/update/delete and
+rebuilt periodically to pick up writes from other workers.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import func, literal_column, select, union
+from sqlalchemy.orm import Session, selectinload
+from app.database import SessionLocal
+from app.models import POEM_SEARCH_DOCUMENT, POEM_SEARCH_TS_CONFIG as TS_CONFIG, Poem, Tag, poem_tags
+
+logger = logging.getLogger(__name__)
+
+# Title and tag terms count this many times more than content terms
+FIELD_BOOST = 2
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its me my
+no not of on or our she so that the their them they this to was we were what
+when which who will with you your
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens without stopwords or single characters."""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _visible(query):
+    return query.filter(Poem.is_public == True, Poem.user_id.isnot(None))
+
+
+def _filter_facets(query, tag: Optional[str], category: Optional[str]):
+    if category:
+        query = query.filter(Poem.category == category)
+    if tag:
+        query = query.filter(Poem.tags.any(func.lower(Tag.name) == tag.lower()))
+    return query
+
+
+def _search_postgres(db: Session, q: str, limit: int, offset: int,
+                     tag: Optional[str], category: Optional[str]) -> Tuple[List[int], int]:
+    ts_query = func.plainto_tsquery(literal_column(f"'{TS_CONFIG}'"), q)
+    # Verbatim index expression, so the planner can use idx_poem_fts
+    document = literal_column(POEM_SEARCH_DOCUMENT)
+
+    # Text hits (GIN expression index) plus poems tagged with a matching tag
+    tagged = select(poem_tags.c.poem_id)\
+        .join(Tag, Tag.id == poem_tags.c.tag_id)\
+        .where(func.to_tsvector(literal_column(f"'{TS_CONFIG}'"), Tag.name).op("@@")(ts_query))
+    matches = union(select(Poem.id).where(document.op("@@")(ts_query)), tagged).subquery()
+
+    query = _filter_facets(_visible(db.query(Poem.id).filter(Poem.id.in_(select(matches.c[0])))), tag, category)
+    total = query.count()
+    rank = func.ts_rank(document, ts_query)
+    rows = query.order_by(rank.desc(), Poem.created_at.desc(), Poem.id.desc()).offset(offset).limit(limit).all()
+    return [row[0] for row in rows], total
+
+
+class PoemSearchIndex:
+    """
+    In-memory inverted index with BM25 ranking.
+
+    Args:
+        k1: Term-frequency saturation
+        b: Document-length normalization
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._facets: Dict[int, Tuple[Optional[str], Set[str]]] = {}
+        self._created: Dict[int, float] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    @staticmethod
+    def _terms(poem: Poem) -> Counter:
+        terms = Counter(tokenize(poem.content))
+        for token in tokenize(poem.title) + [t for tag in poem.tags for t in tokenize(tag.name)]:
+            terms[token] += FIELD_BOOST
+        return terms
+
+    def build(self, db: Session) -> int:
+        """(Re)build the index from all visible poems. Returns the poem count."""
+        poems = _visible(db.query(Poem).options(selectinload(Poem.tags))).all()
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_terms, self._doc_len, self._facets, self._created = {}, {}, {}, {}
+            self._total_len = 0
+            for poem in poems:
+                self._add(poem)
+            self._loaded = True
+        return len(poems)
+
+    def rebuild(self) -> int:
+        """Periodic-task entry point: rebuild from a fresh session."""
+        db = SessionLocal()
+        try:
+            count = self.build(db)
+        finally:
+            db.close()
+        logger.info(f"Rebuilt poem search index ({count} poems)")
+        return count
+
+    def _add(self, poem: Poem) -> None:
+        terms = self._terms(poem)
+        for term, tf in terms.items():
+            self._postings[term][poem.id] = tf
+        self._doc_terms[poem.id] = terms
+        self._doc_len[poem.id] = sum(terms.values())
+        self._total_len += self._doc_len[poem.id]
+        self._facets[poem.id] = (poem.category, {tag.name.lower() for tag in poem.tags})
+        self._created[poem.id] = poem.created_at.timestamp() if poem.created_at else 0.0
+
+    def _remove(self, poem_id: int) -> None:
+        terms = self._doc_terms.pop(poem_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(poem_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(poem_id, 0)
+        self._facets.pop(poem_id, None)
+        self._created.pop(poem_id, None)
+
+    def upsert(self, poem: Poem) -> None:
+        """Re-index a poem after create/update; drops it if no longer visible."""
+        with self._lock:
+            if not self._loaded:
+                return  # Picked up by the first build()
+            self._remove(poem.id)
+            if poem.is_public and poem.user_id is not None:
+                self._add(poem)
+
+    def remove(self, poem_id: int) -> None:
+        with self._lock:
+            self._remove(poem_id)
+
+    def search(self, db: Session, q: str, limit: int, offset: int,
+               tag: Optional[str] = None, category: Optional[str] = None) -> Tuple[List[int], int]:
+        """Ranked poem ids for one page, plus the total number of matches."""
+        terms = set(tokenize(q))
+        with self._lock:
+            if not self._loaded:
+                self.build(db)
+            if not terms or not self._doc_len:
+                return [], 0
+
+            n_docs = len(self._doc_len)
+            avg_len = max(self._total_len / n_docs, 1)
+            tag = tag.lower() if tag else None
+            scores: Dict[int, float] = defaultdict(float)
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for poem_id, tf in postings.items():
+                    poem_category, poem_tags_lower = self._facets[poem_id]
+                    if category and poem_category != category:
+                        continue
+                    if tag and tag not in poem_tags_lower:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[poem_id] / avg_len)
+                    scores[poem_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores, key=lambda pid: (-scores[pid], -self._created[pid], -pid))
+            return ranked[offset:offset + limit], len(ranked)
+
+
+poem_search_index = PoemSearchIndex()
+
+
+def uses_sql_search(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def search_poems(db: Session, q: str, limit: int = 20, offset: int = 0,
+                 tag: Optional[str] = None, category: Optional[str] = None) -> Tuple[List[int], int]:
+    """Relevance-ranked ids of public poems matching q, and the total match count."""
+    q = q.strip()
+    if not q:
+        return [], 0
+    if uses_sql_search(db):
+        return _search_postgres(db, q, limit, offset, tag, category)
+    return poem_search_index.search(db, q, limit, offset, tag, category)
+
+
+def index_poem(poem: Poem) -> None:
+    """Sync the local index after a poem is created or edited."""
+    poem_search_index.upsert(poem)
+
+
+def unindex_poem(poem_id: int) -> None:
+    """Sync the local index after a poem is deleted."""
+    poem_search_index.remove(poem_id)
@@ -0,0 +1,79 @@
+"""
+Shared poem serialization for feed and list endpoints.
+Authors and tags are loaded in bulk with eager-loading options, so a page of
+poems costs a constant number of queries instead of one per poem.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.models import Poem, PoemLike
+
+# Query options for any poem list that is going to be serialized:
+# author via a JOIN, tags via one extra SELECT ... IN for the whole page
+POEM_LOAD_OPTIONS = (
+    joinedload(Poem.user),
+    selectinload(Poem.tags),
+)
+
+
+def serialize_poem(poem: Poem, current_user_id: Optional[int] = None) -> dict:
+    """
+    Build the feed dict for a poem.
+
+    Args:
+        poem: Poem loaded with POEM_LOAD_OPTIONS
+        current_user_id: If given, adds an `is_own` flag for this user
+    """
+    data = {
+        "id": poem.id,
+        "user_id": poem.user_id,
+        "title": poem.title or "Untitled",
+        "content": poem.content,
+        "is_public": poem.is_public,
+        "category": poem.category or "manual",
+        "created_at": poem.created_at,
+        "updated_at": poem.updated_at,
+        "author": f"@{poem.user.username}" if poem.user else "@unknown",
+        "like_count": poem.like_count or 0,
+        "comment_count": poem.comment_count or 0,
+        "tags": [{"id": tag.id, "name": tag.name, "category": tag.category} for tag in poem.tags],
+    }
+    if current_user_id is not None:
+        data["is_own"] = poem.user_id == current_user_id
+    return data
+
+
+def serialize_poems(poems: Iterable[Poem], current_user_id: Optional[int] = None) -> List[dict]:
+    """Serialize a page of poems (see serialize_poem)."""
+    return [serialize_poem(poem, current_user_id) for poem in poems]
+
+
+def get_like_status(db: Session, poem_ids: Iterable[int], user_id: Optional[int] = None) -> Dict[int, dict]:
+    """
+    Like counts and the caller's liked flags for many poems in one query.
+
+    Returns:
+        {poem_id: {"like_count": int, "user_liked": bool}} for poems that exist
+    """
+    poem_ids = list(set(poem_ids))
+    if not poem_ids:
+        return {}
+
+    # LEFT JOIN on the (user_id, poem_id) unique constraint: at most one match per poem
+    rows = db.query(Poem.id, Poem.like_count, PoemLike.id)\
+        .outerjoin(PoemLike, and_(PoemLike.poem_id == Poem.id, PoemLike.user_id == user_id))\
+        .filter(Poem.id.in_(poem_ids))\
+        .all()
+
+    return {
+        poem_id: {"like_count": like_count or 0, "user_liked": like_id is not None}
+        for poem_id, like_count, like_id in rows
+    }
+
+
+def attach_like_status(db: Session, poems: List[dict], user_id: Optional[int]) -> List[dict]:
+    """Embed like_count and user_liked into serialized poems (one query per page)."""
+    status = get_like_status(db, [poem["id"] for poem in poems], user_id)
+    for poem in poems:
+        poem.update(status.get(poem["id"], {"like_count": 0, "user_liked": False}))
+    return poems
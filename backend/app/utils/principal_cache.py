@@ -0,0 +1,86 @@
+"""
+Cache of authenticated users ("principals").
+
+Every authenticated request used to look its user up by username. This
+module keeps a snapshot of each user's columns in a bounded TTL LRU keyed
+by username (usernames are immutable), so a repeat request rebuilds its
+User without a query. Entries are invalidated after any change to the
+user's row (profile, pictures, password, email); the TTL bounds staleness
+for other workers, whose caches this process cannot invalidate.
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User
+from app.utils.cache import LRUCache
+
+_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only view of a cached user; attribute access mirrors User's columns."""
+    columns: Mapping[str, Any]
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def snapshot(user: User) -> Mapping[str, Any]:
+    return MappingProxyType({key: getattr(user, key) for key in _COLUMNS})
+
+
+class PrincipalCache:
+    """
+    Username -> column snapshot.
+
+    Args:
+        max_users: Snapshots kept in memory
+        ttl: Seconds before a snapshot is reloaded
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self._cache = LRUCache(max_size=max_users, ttl=ttl)
+
+    def _load(self, db: Session, username: str) -> Optional[User]:
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            self._cache.set(username, snapshot(user))
+        return user
+
+    def get_user(self, db: Session, username: str) -> Optional[User]:
+        """The user as an ORM object in db; no query on a cache hit."""
+        columns = self._cache.get(username)
+        if columns is None:
+            return self._load(db, username)
+        user = User(**columns)
+        make_transient_to_detached(user)
+        # load=False: trust the snapshot instead of re-selecting the row
+        return db.merge(user, load=False)
+
+    def get_principal(self, username: str) -> Optional[Principal]:
+        """The user as a read-only Principal; opens a short session only on a miss."""
+        columns = self._cache.get(username)
+        if columns is None:
+            db = SessionLocal()
+            try:
+                user = self._load(db, username)
+                columns = snapshot(user) if user is not None else None
+            finally:
+                db.close()
+        return Principal(columns) if columns is not None else None
+
+    def invalidate(self, *usernames: str) -> None:
+        """Drop cached snapshots; call after committing a change to the user's row."""
+        for username in usernames:
+            self._cache.delete(username)
+
+
+principal_cache = PrincipalCache(max_users=settings.PRINCIPAL_CACHE_USERS, ttl=settings.PRINCIPAL_CACHE_TTL)
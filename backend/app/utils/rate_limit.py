@@ -0,0 +1,258 @@
+"""
+Rate limiting for the auth endpoints.
+
+Counters use the sliding-window-counter approximation: each key keeps only
+the hit counts of the current and previous fixed windows, and the rate is
+estimated as `previous * (1 - elapsed fraction) + current`. That is O(1)
+memory per key, with no per-request timestamps. The in-memory store is a
+bounded LRU (idle keys are evicted first); the Redis store shares counters
+across workers.
+
+Limits are applied as route dependencies, so a rejected request never
+reaches bcrypt or the database.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from app.config import settings
+
+# Optional imports (only required for RATE_LIMIT_STORE=redis)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate(previous: int, current: int, fraction: float) -> float:
+    return previous * (1 - fraction) + current
+
+
+def _retry_after(previous: int, current: int, fraction: float, limit: int, window: float) -> int:
+    """Seconds until one more hit fits under the limit."""
+    if current + 1 <= limit and previous:
+        # Wait for enough of the previous window to slide out
+        needed = 1 - (limit - current - 1) / previous
+        return max(1, math.ceil((needed - fraction) * window))
+    # The current window is full: wait for it to become the previous one
+    needed = max(0.0, 1 - (limit - 1) / current) if current else 0.0
+    return max(1, math.ceil((1 - fraction + needed) * window))
+
+
+class RateLimitStore:
+    """Interface for sliding-window counters."""
+
+    # True if hit() does network I/O and must run off the event loop
+    blocking = False
+
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        """
+        Count one hit for key unless it would exceed limit per window seconds.
+        Returns (allowed, retry_after_seconds); rejected hits are not counted.
+        """
+        raise NotImplementedError
+
+    def reset(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process counters in a bounded LRU.
+
+    Args:
+        max_keys: Keys tracked before the least recently hit is evicted
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> [window index, current count, previous count]
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index, fraction = int(now // window), (now % window) / window
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                entry = [index, 0, 0]
+                self._counters[key] = entry
+            elif entry[0] != index:
+                # Roll forward; anything older than one window no longer counts
+                entry[2] = entry[1] if entry[0] == index - 1 else 0
+                entry[0], entry[1] = index, 0
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+            _, current, previous = entry
+            if _estimate(previous, current, fraction) + 1 > limit:
+                return False, _retry_after(previous, current, fraction, limit, window)
+            entry[1] += 1
+            return True, 0
+
+    def reset(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._counters)
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Counters shared by every worker (needs the redis package)."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "rhymebox:ratelimit:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RATE_LIMIT_STORE=redis requires the 'redis' package. Please pip install redis.")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index, fraction = int(now // window), (now % window) / window
+        current_key = f"{self._prefix}{key}:{index}"
+        previous_key = f"{self._prefix}{key}:{index - 1}"
+
+        pipe = self._client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(window * 2) + 1)
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+        previous = int(previous or 0)
+
+        # current already includes this hit
+        if _estimate(previous, current, fraction) > limit:
+            self._client.decr(current_key)
+            return False, _retry_after(previous, current - 1, fraction, limit, window)
+        return True, 0
+
+    def reset(self, key):
+        for found in self._client.scan_iter(f"{self._prefix}{key}:*"):
+            self._client.delete(found)
+
+
+def create_rate_limit_store() -> RateLimitStore:
+    """Build the store selected by RATE_LIMIT_STORE ("memory" or "redis")."""
+    if settings.RATE_LIMIT_STORE == "redis":
+        return RedisRateLimitStore(settings.REDIS_URL)
+    return InMemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limit_store = create_rate_limit_store()
+
+
+def client_ip(request: Request) -> str:
+    """
+    Caller's IP. Behind a reverse proxy (Railway, Render) every request comes
+    from the proxy, so with RATE_LIMIT_TRUST_PROXY set the address the proxy
+    appended to X-Forwarded-For is used instead. That is the last entry:
+    earlier ones are supplied by the client and can be spoofed.
+    """
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def body_field(request: Request, *names: str) -> Optional[str]:
+    """First non-empty field of a JSON body, lowercased (for per-account keys)."""
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    if not isinstance(body, dict):
+        return None
+    for name in names:
+        value = body.get(name)
+        if isinstance(value, str) and value.strip():
+            return value.strip().lower()
+    return None
+
+
+class RateLimit:
+    """
+    Route dependency enforcing per-IP and per-account limits:
+
+        @router.post("/token", dependencies=[Depends(RateLimit("login", ...))])
+
+    Args:
+        name: Namespace for this endpoint's counters
+        per_ip: Requests allowed per window from one IP (0 = no IP limit)
+        per_account: Requests allowed per window for one account (0 = none)
+        window: Window length in seconds
+        account_key: Async function extracting the account from the request
+    """
+
+    def __init__(self, name: str, per_ip: int, per_account: int, window: float,
+                 account_key: Optional[Callable] = None, store: Optional[RateLimitStore] = None):
+        self.name = name
+        self.per_ip = per_ip
+        self.per_account = per_account
+        self.window = window
+        self.account_key = account_key
+        self.store = store
+
+    async def _check(self, key: str, limit: int) -> None:
+        store = self.store if self.store is not None else rate_limit_store
+        try:
+            if store.blocking:
+                allowed, retry_after = await run_in_threadpool(store.hit, key, limit, self.window)
+            else:
+                allowed, retry_after = store.hit(key, limit, self.window)
+        except Exception as e:
+            # Fail open: an unavailable store must not lock everyone out
+            logger.warning(f"Rate limit store error for '{self.name}': {e}")
+            return
+        if not allowed:
+            logger.warning(f"Rate limit exceeded: {key}")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    async def __call__(self, request: Request) -> None:
+        if self.per_ip:
+            await self._check(f"{self.name}:ip:{client_ip(request)}", self.per_ip)
+        if self.per_account and self.account_key:
+            account = await self.account_key(request)
+            if account:
+                await self._check(f"{self.name}:account:{account}", self.per_account)
+
+
+async def login_account(request: Request) -> Optional[str]:
+    return await body_field(request, "username", "email")
+
+
+async def reset_account(request: Request) -> Optional[str]:
+    return await body_field(request, "email")
+
+
+login_rate_limit = RateLimit(
+    "login",
+    per_ip=settings.LOGIN_RATE_LIMIT_PER_IP,
+    per_account=settings.LOGIN_RATE_LIMIT_PER_ACCOUNT,
+    window=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    account_key=login_account,
+)
+
+forgot_password_rate_limit = RateLimit(
+    "forgot-password",
+    per_ip=settings.FORGOT_PASSWORD_RATE_LIMIT_PER_IP,
+    per_account=settings.FORGOT_PASSWORD_RATE_LIMIT_PER_ACCOUNT,
+    window=settings.FORGOT_PASSWORD_RATE_LIMIT_WINDOW_SECONDS,
+    account_key=reset_account,
+)
@@ -1,12 +1,21 @@
 import bcrypt
-from datetime import datetime, timedelta
+import hashlib
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 from jose import jwt, JWTError
 from app.config import settings
+from app.utils.cache import LRUCache
+from app.utils.jwt_keys import get_jwt_keys
+
+# sha256(token) -> verified claims, each entry expiring with its token
+_verified_tokens = LRUCache(max_size=settings.VERIFIED_TOKEN_CACHE_SIZE)
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -20,42 +29,60 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         print(f"❌ Password verification error: {e}")
         return False
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if a bcrypt hash ("$2b$<cost>$...") wasn't made with BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split('$')[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create a JWT access token with configurable expiration."""
     to_encode = data.copy()
     
     # ✅ Use provided expiration or default from settings
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # ✅ Store as Unix timestamp (integer)
-    to_encode.update({"exp": int(expire.timestamp())})
+    # ✅ Store as Unix timestamp; jti and iat make the token revocable.
+    # iat keeps sub-second precision (JWT NumericDate allows fractions) so a
+    # password change also revokes tokens issued earlier in the same second.
+    to_encode.update({"exp": int(expire.timestamp()), "iat": time.time(), "jti": uuid.uuid4().hex})
     
     print(f"🔐 Creating token - expires in {settings.ACCESS_TOKEN_EXPIRE_MINUTES} minutes")
     print(f"   Expiration time: {expire}")
     
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    keys = get_jwt_keys()
+    if keys.signing_key is None:
+        raise RuntimeError("No JWT private key configured; this instance can only verify tokens")
+    headers = {"kid": keys.key_id} if keys.key_id else None
+    encoded_jwt = jwt.encode(to_encode, keys.signing_key, algorithm=keys.algorithm, headers=headers)
     return encoded_jwt
 
 def decode_access_token(token: str):
-    """Decode and verify a JWT access token."""
+    """
+    Verify a JWT access token (signature and exp) and return its claims.
+    Verified tokens are cached by hash until they expire, so repeat requests
+    with the same token skip signature verification.
+    """
+    digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    cached = _verified_tokens.get(digest)
+    if cached is not None:
+        return dict(cached)
+    
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        
-        # Check expiration
-        exp = payload.get("exp")
-        if exp:
-            exp_datetime = datetime.utcfromtimestamp(exp)
-            now = datetime.utcnow()
-            
-            if now > exp_datetime:
-                raise JWTError("Token has expired")
-        
-        return payload
-        
+        keys = get_jwt_keys()
+        payload = jwt.decode(token, keys.verification_key, algorithms=[keys.algorithm])
     except JWTError as e:
         raise Exception(f"JWT validation failed: {str(e)}")
     except Exception as e:
         raise Exception(f"Token decode failed: {str(e)}")
+    
+    # jwt.decode already rejected expired tokens; cache until exp
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp else None
+    if ttl is None or ttl > 0:
+        _verified_tokens.set(digest, MappingProxyType(dict(payload)), ttl=ttl)
+    return payload
@@ -0,0 +1,142 @@
+"""
+Immutable in-memory tag catalog.
+
+The tag vocabulary is fixed (PREDEFINED_TAGS), so the catalog is loaded once
+at startup into a frozen snapshot with a pre-rendered JSON body and ETag.
+Lookups by id or name never touch the database. Only usage counts change at
+runtime; they live in tags.usage_count and are read separately.
+"""
+import json
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import PREDEFINED_TAGS, Tag, poem_tags
+from app.utils.http_cache import make_etag
+
+
+def category_slug(category_name: str) -> str:
+    """'Tone / Mood' -> 'tone_mood' (same slugs as scripts/init_db.py)."""
+    return category_name.lower().replace(' / ', '_').replace(' ', '_')
+
+
+@dataclass(frozen=True)
+class TagCatalog:
+    """Frozen snapshot of every tag, indexed by id and lowercased name."""
+    tags: Tuple[Mapping, ...]
+    by_id: Mapping[int, Mapping]
+    by_name: Mapping[str, Mapping]
+    body: str
+    etag: str
+
+    def resolve(self, refs: Iterable) -> Tuple[List[int], List]:
+        """Map tag ids or names to ids. Returns (ids, unknown refs)."""
+        ids, unknown = [], []
+        for ref in refs:
+            tag = self.by_id.get(ref) if isinstance(ref, int) else self.by_name.get(str(ref).strip().lower())
+            if tag is None:
+                unknown.append(ref)
+            elif tag["id"] not in ids:
+                ids.append(tag["id"])
+        return ids, unknown
+
+
+def ensure_predefined_tags(db: Session) -> int:
+    """Insert any PREDEFINED_TAGS missing from the tags table. Returns the number added."""
+    existing = {name.lower() for (name,) in db.query(Tag.name).all()}
+    missing = [
+        Tag(name=tag_name, category=category_slug(category_name), color_class=data['color_class'])
+        for category_name, data in PREDEFINED_TAGS.items()
+        for tag_name in data['tags']
+        if tag_name.lower() not in existing
+    ]
+    if not missing:
+        return 0
+    try:
+        db.add_all(missing)
+        db.commit()
+    except IntegrityError:
+        # Another worker seeded them concurrently
+        db.rollback()
+        return 0
+    return len(missing)
+
+
+def build_catalog(db: Session) -> TagCatalog:
+    rows = db.query(Tag.id, Tag.name, Tag.category, Tag.color_class).order_by(Tag.category, Tag.name).all()
+    tags = tuple(
+        MappingProxyType({"id": r.id, "name": r.name, "category": r.category, "color_class": r.color_class})
+        for r in rows
+    )
+
+    categories: Dict[str, dict] = {}
+    for tag in tags:
+        group = categories.setdefault(tag["category"], {"name": tag["category"], "color_class": tag["color_class"], "tags": []})
+        group["tags"].append(dict(tag))
+
+    body = json.dumps({"categories": list(categories.values()), "tags": [dict(t) for t in tags]})
+    return TagCatalog(
+        tags=tags,
+        by_id=MappingProxyType({t["id"]: t for t in tags}),
+        by_name=MappingProxyType({t["name"].lower(): t for t in tags}),
+        body=body,
+        etag=make_etag(body),
+    )
+
+
+_catalog: Optional[TagCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def load_tag_catalog() -> TagCatalog:
+    """Seed missing predefined tags and (re)build the catalog. Called at startup."""
+    global _catalog
+    db = SessionLocal()
+    try:
+        ensure_predefined_tags(db)
+        catalog = build_catalog(db)
+    finally:
+        db.close()
+    with _catalog_lock:
+        _catalog = catalog
+    return catalog
+
+
+def get_tag_catalog() -> TagCatalog:
+    """The current catalog snapshot (built on first use if startup didn't)."""
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            catalog = _catalog
+        if catalog is None:
+            catalog = load_tag_catalog()
+    return catalog
+
+
+def adjust_usage_counts(db: Session, deltas: Dict[int, int]) -> None:
+    """Apply per-tag usage_count deltas with one batched UPDATE. Does not commit."""
+    batch = [{"b_id": tag_id, "b_delta": delta} for tag_id, delta in deltas.items() if delta]
+    if not batch:
+        return
+    new_count = func.coalesce(Tag.usage_count, 0) + bindparam("b_delta")
+    stmt = update(Tag)\
+        .where(Tag.id == bindparam("b_id"))\
+        .values(usage_count=case((new_count < 0, 0), else_=new_count))
+    db.connection().execute(stmt, batch)
+
+
+def recount_usage(db: Session) -> int:
+    """Recompute every tag's usage_count from poem_tags in one UPDATE. Returns rows changed."""
+    actual = select(func.count()).where(poem_tags.c.tag_id == Tag.id).scalar_subquery()
+    result = db.execute(
+        update(Tag)
+        .where(func.coalesce(Tag.usage_count, -1) != actual)
+        .values(usage_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
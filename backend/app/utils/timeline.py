@@ -0,0 +1,290 @@
+"""
+Fan-out-on-write home timelines.
+When a poem is created its id is pushed into the timeline of the author and
+each accepted friend, so reading a home timeline is one indexed range read
+over timeline_entries (or a hit in the bounded in-process cache).
+"""
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Poem, TimelineEntry
+from app.utils.cache import LRUCache
+from app.utils.friend_graph import friend_graph
+from app.utils.pagination import apply_keyset, decode_cursor, split_page
+
+TimelineItem = namedtuple("TimelineItem", ["created_at", "poem_id"])
+
+
+class TimelineCache:
+    """
+    Interface for timeline caches. A cached timeline holds the newest entries
+    of a user's timeline and a flag saying whether that is the whole timeline.
+    Implement this to plug in a shared backend for multi-worker deployments.
+    """
+
+    def get(self, user_id: int) -> Optional[Tuple[Tuple[TimelineItem, ...], bool]]:
+        raise NotImplementedError
+
+    def set(self, user_id: int, items: Iterable[TimelineItem], complete: bool) -> None:
+        raise NotImplementedError
+
+    def load(self, user_id: int, loader: Callable[[], Tuple[Tuple[TimelineItem, ...], bool]]):
+        """Fill a missing timeline from loader() and return (items, complete)."""
+        items, complete = loader()
+        self.set(user_id, items, complete)
+        return items, complete
+
+    def push(self, user_ids: Iterable[int], item: TimelineItem) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        raise NotImplementedError
+
+
+class _PendingLoad:
+    """Pushes and invalidations that arrive while a timeline is being read from the DB."""
+    __slots__ = ("readers", "pushed", "stale")
+
+    def __init__(self):
+        self.readers = 0
+        self.pushed: List[TimelineItem] = []
+        self.stale = False
+
+
+def _merge(items: Tuple[TimelineItem, ...], pushed: Iterable[TimelineItem]) -> Tuple[TimelineItem, ...]:
+    """Add pushed items not already present, keeping newest-first order."""
+    known = {item.poem_id for item in items}
+    extra = tuple(item for item in pushed if item.poem_id not in known)
+    return tuple(sorted(items + extra, reverse=True)) if extra else items
+
+
+class InMemoryTimelineCache(TimelineCache):
+    """
+    Per-process LRU of timelines, each capped at max_length entries.
+
+    Pushes only reach the worker that created the poem, so with several
+    workers a timeline cached elsewhere can miss new poems until it expires
+    after ttl seconds (a push does not extend that). Set TIMELINE_CACHE_TTL
+    to how stale a home feed may be, or plug in a shared TimelineCache.
+    """
+
+    def __init__(self, max_users: int, max_length: int, ttl: Optional[float] = None):
+        self.max_length = max_length
+        self.ttl = ttl
+        # user_id -> (items, complete, expires_at)
+        self._timelines = LRUCache(max_size=max_users, ttl=ttl)
+        self._loading: Dict[int, _PendingLoad] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        cached = self._timelines.get(user_id)
+        return cached[:2] if cached is not None else None
+
+    def _store(self, user_id, items, complete, expires_at=None):
+        items = tuple(items)
+        if len(items) > self.max_length:
+            items, complete = items[:self.max_length], False
+        now = time.monotonic()
+        if expires_at is None:
+            expires_at = now + self.ttl if self.ttl is not None else None
+        ttl = expires_at - now if expires_at is not None else None
+        if ttl is not None and ttl <= 0:
+            self._timelines.delete(user_id)
+        else:
+            self._timelines.set(user_id, (items, complete, expires_at), ttl=ttl)
+        return items, complete
+
+    def set(self, user_id, items, complete):
+        with self._lock:
+            self._store(user_id, items, complete)
+
+    def load(self, user_id, loader):
+        with self._lock:
+            pending = self._loading.setdefault(user_id, _PendingLoad())
+            pending.readers += 1
+        try:
+            items, complete = loader()
+        finally:
+            with self._lock:
+                pending.readers -= 1
+                if not pending.readers:
+                    self._loading.pop(user_id, None)
+
+        with self._lock:
+            # A poem pushed after the DB read started would otherwise be lost:
+            # its push found nothing cached, and the read may not have seen it
+            items = _merge(tuple(items), pending.pushed)
+            if pending.stale:
+                return items, complete
+            return self._store(user_id, items, complete)
+
+    def push(self, user_ids, item):
+        # Only timelines already in memory (or being loaded) are updated; others load on next read
+        with self._lock:
+            for user_id in user_ids:
+                pending = self._loading.get(user_id)
+                if pending is not None:
+                    pending.pushed.append(item)
+                cached = self._timelines.get(user_id)
+                if cached is None:
+                    continue
+                items, complete, expires_at = cached
+                merged = _merge(items, (item,))
+                if merged is not items:
+                    self._store(user_id, merged, complete, expires_at)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                pending = self._loading.get(user_id)
+                if pending is not None:
+                    # The in-flight read may predate the change; don't cache it
+                    pending.stale = True
+                self._timelines.delete(user_id)
+
+
+timeline_cache: TimelineCache = InMemoryTimelineCache(
+    max_users=settings.TIMELINE_CACHE_USERS,
+    max_length=settings.TIMELINE_MAX_LENGTH,
+    ttl=settings.TIMELINE_CACHE_TTL,
+)
+
+
+def get_friend_ids(db: Session, user_id: int) -> List[int]:
+    """Ids of accepted friends in either direction (from the cached friendship graph)."""
+    return list(friend_graph.friend_ids(db, user_id))
+
+
+def fan_out_poem(db: Session, poem: Poem) -> List[int]:
+    """
+    Push a poem into its author's timeline and, if public, into every
+    accepted friend's timeline: on creation, or when a private poem is made
+    public. Timelines that already hold it are skipped. Returns the recipient
+    user ids.
+    """
+    recipients = {poem.user_id}
+    if poem.is_public:
+        recipients.update(get_friend_ids(db, poem.user_id))
+
+    # Uses the (user_id, poem_id) unique index
+    existing = {
+        user_id for (user_id,) in db.query(TimelineEntry.user_id).filter(
+            TimelineEntry.user_id.in_(recipients),
+            TimelineEntry.poem_id == poem.id
+        )
+    }
+    recipients -= existing
+    if not recipients:
+        return []
+
+    db.bulk_insert_mappings(TimelineEntry, [
+        {"user_id": user_id, "poem_id": poem.id, "author_id": poem.user_id, "created_at": poem.created_at}
+        for user_id in recipients
+    ])
+    db.commit()
+
+    timeline_cache.push(recipients, TimelineItem(poem.created_at, poem.id))
+    return list(recipients)
+
+
+def retract_poem(db: Session, poem: Poem) -> int:
+    """Drop a poem that was made private from its author's friends' timelines."""
+    friend_ids = get_friend_ids(db, poem.user_id)
+    if not friend_ids:
+        return 0
+
+    deleted = db.query(TimelineEntry).filter(
+        TimelineEntry.user_id.in_(friend_ids),
+        TimelineEntry.poem_id == poem.id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    timeline_cache.invalidate(friend_ids)
+    return deleted
+
+
+def backfill_author(db: Session, user_id: int, author_id: int, limit: Optional[int] = None) -> int:
+    """
+    Copy an author's newest poems into a user's timeline, e.g. when a
+    friendship is accepted. Private poems are only copied into the author's
+    own timeline. Returns the number of entries added.
+    """
+    limit = limit or settings.TIMELINE_MAX_LENGTH
+    query = db.query(Poem.id, Poem.created_at).filter(Poem.user_id == author_id)
+    if user_id != author_id:
+        query = query.filter(Poem.is_public == True)
+    poems = query.order_by(Poem.created_at.desc()).limit(limit).all()
+    if not poems:
+        return 0
+
+    existing = {
+        poem_id for (poem_id,) in db.query(TimelineEntry.poem_id).filter(
+            TimelineEntry.user_id == user_id,
+            TimelineEntry.poem_id.in_([p.id for p in poems])
+        )
+    }
+    entries = [
+        {"user_id": user_id, "poem_id": p.id, "author_id": author_id, "created_at": p.created_at}
+        for p in poems if p.id not in existing
+    ]
+    db.bulk_insert_mappings(TimelineEntry, entries)
+    db.commit()
+
+    timeline_cache.invalidate([user_id])
+    return len(entries)
+
+
+def remove_author(db: Session, user_id: int, author_id: int) -> int:
+    """Drop an author's poems from a user's timeline, e.g. after unfriending."""
+    deleted = db.query(TimelineEntry).filter(
+        TimelineEntry.user_id == user_id,
+        TimelineEntry.author_id == author_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    timeline_cache.invalidate([user_id])
+    return deleted
+
+
+def read_timeline(db: Session, user_id: int, limit: int, cursor: Optional[str] = None):
+    """
+    Read one page of a user's timeline, newest first.
+
+    Returns:
+        (poem_ids, next_cursor) for the page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    def load_head():
+        max_length = settings.TIMELINE_MAX_LENGTH
+        rows = db.query(TimelineEntry.created_at, TimelineEntry.poem_id)\
+            .filter(TimelineEntry.user_id == user_id)\
+            .order_by(TimelineEntry.created_at.desc(), TimelineEntry.poem_id.desc())\
+            .limit(max_length + 1).all()
+        items = tuple(TimelineItem(*row) for row in rows)
+        return items[:max_length], len(items) <= max_length
+
+    cached = timeline_cache.get(user_id)
+    if cached is None:
+        cached = timeline_cache.load(user_id, load_head)
+
+    items, complete = cached
+    if cursor:
+        after = decode_cursor(cursor)
+        items = [item for item in items if tuple(item) < after]
+
+    if len(items) > limit or complete:
+        page = list(items[:limit + 1])
+    else:
+        # Page reaches past the cached head: range read on the index instead
+        query = db.query(TimelineEntry.created_at, TimelineEntry.poem_id)\
+            .filter(TimelineEntry.user_id == user_id)
+        query = apply_keyset(query, TimelineEntry.created_at, TimelineEntry.poem_id, cursor)
+        page = [TimelineItem(*row) for row in query.limit(limit + 1).all()]
+
+    page, next_cursor = split_page(page, limit, key=lambda item: (item.created_at, item.poem_id))
+    return [item.poem_id for item in page], next_cursor
@@ -0,0 +1,204 @@
+"""
+Trending poems: exponentially time-decayed activity scores.
+
+Every event (post, like, comment) adds `points * e^((t - epoch) / tau)` to the
+poem's row in poem_scores, where `epoch` is the start of the current
+TRENDING_EPOCH_HOURS window. Decay is implicit: newer events weigh
+exponentially more, and all poems share one reference time, so ordering by
+the stored score *is* ordering by decayed score. Reading the top N is a
+single scan of the (epoch, score) index.
+
+Weights grow within a window, so a periodic rebase job rescales rows from
+older epochs into the current one (and prunes rows that decayed to nothing),
+keeping scores bounded and comparable. Reads never write: until the rebase
+has run, rows from older epochs are rescaled in the ORDER BY instead.
+"""
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Poem, PoemScore
+
+logger = logging.getLogger(__name__)
+
+# Points per event (views are not tracked, so they don't score)
+POST_POINTS = 1.0
+LIKE_POINTS = 3.0
+COMMENT_POINTS = 5.0
+
+# Rows whose rebased score falls below this are pruned
+MIN_SCORE = 1e-3
+
+_TAU = settings.TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+_EPOCH_SECONDS = settings.TRENDING_EPOCH_HOURS * 3600
+
+_rebased_epoch: Optional[int] = None
+
+
+def _timestamp(value: Optional[datetime] = None) -> float:
+    if value is None:
+        return time.time()
+    # Naive datetimes in this app are UTC (datetime.utcnow)
+    return value.replace(tzinfo=timezone.utc).timestamp() if value.tzinfo is None else value.timestamp()
+
+
+def current_epoch(now: Optional[float] = None) -> int:
+    """Start of the current epoch window (same on every worker)."""
+    now = time.time() if now is None else now
+    return int(now // _EPOCH_SECONDS * _EPOCH_SECONDS)
+
+
+def event_weight(at: float, epoch: int) -> float:
+    return math.exp((at - epoch) / _TAU)
+
+
+def _clamped(expr):
+    return case((expr < 0, 0.0), else_=expr)
+
+
+def _apply_delta(db: Session, poem_id: int, delta: float, epoch: int) -> None:
+    updated = db.query(PoemScore)\
+        .filter(PoemScore.poem_id == poem_id, PoemScore.epoch == epoch)\
+        .update({PoemScore.score: _clamped(PoemScore.score + delta)}, synchronize_session=False)
+    if updated:
+        return
+
+    row = db.query(PoemScore.epoch).filter(PoemScore.poem_id == poem_id).first()
+    if row is None:
+        db.add(PoemScore(poem_id=poem_id, score=max(delta, 0.0), epoch=epoch))
+        db.flush()
+        return
+
+    # Row from an older window not rebased yet: rescale it on the way
+    factor = math.exp((row.epoch - epoch) / _TAU)
+    db.query(PoemScore)\
+        .filter(PoemScore.poem_id == poem_id, PoemScore.epoch == row.epoch)\
+        .update({
+            PoemScore.score: _clamped(PoemScore.score * factor + delta),
+            PoemScore.epoch: epoch,
+        }, synchronize_session=False)
+
+
+def bump_score(db: Session, poem_id: int, points: float, at: Optional[datetime] = None) -> None:
+    """
+    Add an event's decayed points to a poem's score. Best effort: runs in a
+    savepoint and never raises, so it can't fail the write it rides along with.
+    The caller commits.
+    """
+    epoch = current_epoch()
+    delta = points * event_weight(_timestamp(at), epoch)
+    for attempt in range(2):
+        try:
+            with db.begin_nested():
+                _apply_delta(db, poem_id, delta, epoch)
+            return
+        except IntegrityError:
+            # A concurrent request inserted the row first: retry as an update
+            continue
+        except Exception as e:
+            logger.warning(f"Trending score update failed for poem {poem_id}: {e}")
+            return
+
+
+def remove_score(db: Session, poem_id: int) -> None:
+    """Drop a poem from trending (e.g. deleted). The caller commits."""
+    db.query(PoemScore).filter(PoemScore.poem_id == poem_id).delete(synchronize_session=False)
+
+
+def rebase_scores(db: Session, epoch: Optional[int] = None) -> dict:
+    """
+    Rescale every row from an older epoch into the current one and prune rows
+    that decayed below MIN_SCORE. Idempotent; commits.
+    """
+    global _rebased_epoch
+    epoch = epoch or current_epoch()
+    old_epochs = [e for (e,) in db.query(PoemScore.epoch).filter(PoemScore.epoch < epoch).distinct().all()]
+
+    rebased = 0
+    for old in old_epochs:
+        factor = math.exp((old - epoch) / _TAU)
+        rebased += db.query(PoemScore)\
+            .filter(PoemScore.epoch == old)\
+            .update({PoemScore.score: PoemScore.score * factor, PoemScore.epoch: epoch}, synchronize_session=False)
+    pruned = db.query(PoemScore).filter(PoemScore.score < MIN_SCORE).delete(synchronize_session=False)
+    db.commit()
+
+    _rebased_epoch = epoch
+    if rebased or pruned:
+        logger.info(f"Trending rebase to epoch {epoch}: rescaled {rebased} rows, pruned {pruned}")
+    return {"epoch": epoch, "rebased": rebased, "pruned": pruned}
+
+
+def run_rebase() -> dict:
+    """Periodic-task entry point."""
+    db = SessionLocal()
+    try:
+        return rebase_scores(db)
+    finally:
+        db.close()
+
+
+def rebuild_scores(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute all scores from stored counters, treating each poem's likes
+    and comments as if they happened when it was posted. Commits.
+    """
+    epoch = current_epoch()
+    db.query(PoemScore).delete(synchronize_session=False)
+
+    poems = db.query(Poem.id, Poem.created_at, Poem.like_count, Poem.comment_count)\
+        .filter(Poem.is_public == True, Poem.user_id.isnot(None))\
+        .all()
+    batch, total = [], 0
+    for p in poems:
+        points = POST_POINTS + LIKE_POINTS * (p.like_count or 0) + COMMENT_POINTS * (p.comment_count or 0)
+        score = points * event_weight(_timestamp(p.created_at), epoch)
+        if score >= MIN_SCORE:
+            batch.append({"poem_id": p.id, "score": score, "epoch": epoch})
+        if len(batch) >= batch_size:
+            db.bulk_insert_mappings(PoemScore, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.bulk_insert_mappings(PoemScore, batch)
+        total += len(batch)
+    db.commit()
+    return total
+
+
+def read_trending(db: Session, limit: int, offset: int = 0) -> List[int]:
+    """
+    Ids of visible poems, hottest first. Read-only: once every row is in the
+    current epoch this is one scan of idx_poem_score_epoch.
+    """
+    global _rebased_epoch
+    epoch = current_epoch()
+    old_epochs = []
+    if _rebased_epoch != epoch:
+        old_epochs = [e for (e,) in db.query(PoemScore.epoch).filter(PoemScore.epoch < epoch).distinct().all()]
+        if not old_epochs:
+            # Writes only ever use the current epoch, so this stays true until it ends
+            _rebased_epoch = epoch
+
+    query = db.query(PoemScore.poem_id)\
+        .join(Poem, Poem.id == PoemScore.poem_id)\
+        .filter(Poem.is_public == True, Poem.user_id.isnot(None))
+    if old_epochs:
+        # Not rebased yet (the periodic task will): rescale older rows at read time
+        score = PoemScore.score * case(
+            *[(PoemScore.epoch == old, math.exp((old - epoch) / _TAU)) for old in old_epochs],
+            else_=1.0,
+        )
+        query = query.order_by(score.desc(), PoemScore.poem_id.desc())
+    else:
+        query = query.filter(PoemScore.epoch == epoch)\
+            .order_by(PoemScore.score.desc(), PoemScore.poem_id.desc())
+
+    rows = query.offset(offset).limit(limit).all()
+    return [row[0] for row in rows]
@@ -0,0 +1,176 @@
+"""
+User search for the autocomplete in friends.js.
+
+Results are ranked exact > prefix > substring on username or display name.
+On PostgreSQL the query runs against pg_trgm GIN indexes (see migration 004),
+so ILIKE '%q%' no longer scans the whole users table. Other databases
+(SQLite locally) use an in-memory sorted-prefix index: every suffix of each
+name is kept in a sorted list, so a prefix walk with bisect finds
+substring matches in O(log n + limit).
+"""
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+# Rank buckets (lower is better)
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_postgres(db: Session, q: str, limit: int, exclude_id: Optional[int]) -> List[User]:
+    """Trigram-indexed ILIKE search with exact > prefix > substring ranking."""
+    term = _escape_like(q)
+    username = func.lower(User.username)
+    name = func.lower(func.coalesce(User.name, ""))
+    rank = case(
+        (or_(username == q, name == q), EXACT),
+        (or_(username.like(f"{term}%", escape="\\"), name.like(f"{term}%", escape="\\")), PREFIX),
+        else_=SUBSTRING,
+    )
+    query = db.query(User).filter(or_(
+        User.username.ilike(f"%{term}%", escape="\\"),
+        User.name.ilike(f"%{term}%", escape="\\"),
+    ))
+    if exclude_id is not None:
+        query = query.filter(User.id != exclude_id)
+    return query.order_by(rank, func.length(User.username), User.username).limit(limit).all()
+
+
+class UserSearchIndex:
+    """
+    In-memory sorted-prefix index over usernames and display names.
+
+    `_full` holds (whole lowercased key, user_id) pairs: a prefix walk yields
+    exact matches first, then prefix matches. `_suffixes` holds every proper
+    suffix, so a prefix walk over it yields substring matches.
+    """
+
+    def __init__(self):
+        self._full: List[Tuple[str, int]] = []
+        self._suffixes: List[Tuple[str, int]] = []
+        self._keys: Dict[int, Tuple[str, ...]] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    @staticmethod
+    def _user_keys(username: str, name: Optional[str]) -> Tuple[str, ...]:
+        keys = {(username or "").lower(), (name or "").lower()}
+        return tuple(k for k in keys if k)
+
+    def build(self, db: Session) -> int:
+        """(Re)build the index from the users table. Returns the user count."""
+        full, suffixes, keys = [], [], {}
+        for user_id, username, name in db.query(User.id, User.username, User.name).all():
+            user_keys = self._user_keys(username, name)
+            keys[user_id] = user_keys
+            for key in user_keys:
+                full.append((key, user_id))
+                suffixes.extend((key[i:], user_id) for i in range(1, len(key)))
+        full.sort()
+        suffixes.sort()
+        with self._lock:
+            self._full, self._suffixes, self._keys = full, suffixes, keys
+            self._loaded = True
+        return len(keys)
+
+    def rebuild(self) -> int:
+        """Periodic-task entry point: rebuild from a fresh session."""
+        db = SessionLocal()
+        try:
+            count = self.build(db)
+        finally:
+            db.close()
+        logger.info(f"Rebuilt user search index ({count} users)")
+        return count
+
+    def add_user(self, user_id: int, username: str, name: Optional[str]) -> None:
+        """Index a new user or re-index one whose name changed."""
+        with self._lock:
+            if not self._loaded:
+                return  # Picked up by the first build()
+            self._remove(user_id)
+            user_keys = self._user_keys(username, name)
+            self._keys[user_id] = user_keys
+            for key in user_keys:
+                bisect.insort(self._full, (key, user_id))
+                for i in range(1, len(key)):
+                    bisect.insort(self._suffixes, (key[i:], user_id))
+
+    def _remove(self, user_id: int) -> None:
+        for key in self._keys.pop(user_id, ()):
+            self._discard(self._full, (key, user_id))
+            for i in range(1, len(key)):
+                self._discard(self._suffixes, (key[i:], user_id))
+
+    @staticmethod
+    def _discard(entries: List[Tuple[str, int]], entry: Tuple[str, int]) -> None:
+        i = bisect.bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    @staticmethod
+    def _walk(entries: List[Tuple[str, int]], q: str):
+        i = bisect.bisect_left(entries, (q, -1))
+        while i < len(entries) and entries[i][0].startswith(q):
+            yield entries[i]
+            i += 1
+
+    def search(self, db: Session, q: str, limit: int, exclude_id: Optional[int] = None) -> List[int]:
+        """Ranked user ids matching q."""
+        with self._lock:
+            if not self._loaded:
+                self.build(db)
+            ranked: List[int] = []
+            seen = {exclude_id}
+
+            # Exact matches sort before longer keys sharing the prefix
+            for key, user_id in self._walk(self._full, q):
+                if user_id not in seen:
+                    seen.add(user_id)
+                    ranked.append(user_id)
+                    if len(ranked) >= limit:
+                        return ranked
+            for _, user_id in self._walk(self._suffixes, q):
+                if user_id not in seen:
+                    seen.add(user_id)
+                    ranked.append(user_id)
+                    if len(ranked) >= limit:
+                        break
+            return ranked
+
+
+user_search_index = UserSearchIndex()
+
+
+def uses_sql_search(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def search_users(db: Session, q: str, limit: int, exclude_id: Optional[int] = None) -> List[User]:
+    """Users matching q (case-insensitive), best match first."""
+    q = q.strip().lower()
+    if not q:
+        return []
+    if uses_sql_search(db):
+        return _search_postgres(db, q, limit, exclude_id)
+
+    user_ids = user_search_index.search(db, q, limit, exclude_id)
+    if not user_ids:
+        return []
+    users = {u.id: u for u in db.query(User).filter(User.id.in_(user_ids)).all()}
+    return [users[uid] for uid in user_ids if uid in users]
+
+
+def index_user(user: User) -> None:
+    """Keep the local index current after a signup or name change."""
+    user_search_index.add_user(user.id, user.username, user.name)
@@ -0,0 +1,69 @@
+"""
+Migration: Create indexes declared in app/models.py that the database lacks
+
+create_all() builds indexes only together with a new table, so databases
+created before an index was added to the models never get it. This covers
+the chat history, user search (pg_trgm), poem full-text search and tag feed
+indexes, and drops indexes the models have replaced. Safe to run repeatedly;
+indexes that already exist are skipped.
+
+Run with: python -m scripts.add_missing_indexes
+"""
+from sqlalchemy import inspect, text
+from app.database import engine, Base
+import app.models  # noqa: F401 - registers every table on Base.metadata
+
+# Indexes replaced by a wider one in the models: table -> index names
+SUPERSEDED_INDEXES = {
+    "chat_messages": ["idx_chat_between"],  # by idx_chat_between_created
+}
+
+def add_missing_indexes():
+    """Create every model index missing from an existing table."""
+
+    print("\n" + "="*60)
+    print("🔧 MIGRATION: Creating missing indexes")
+    print("="*60)
+
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        # Trigram indexes need the extension first
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = 0
+    dropped = 0
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # create_all() builds new tables with their indexes
+
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            # PostgreSQL-only indexes (trigram, full-text) are marked with ddl_if
+            ddl_if = index._ddl_if
+            if ddl_if is not None and ddl_if.dialect and ddl_if.dialect != dialect:
+                continue
+
+            print(f"📝 Creating {index.name} on {table.name}...")
+            index.create(bind=engine)
+            created += 1
+
+        # Drop superseded indexes only once their replacement exists
+        declared = {index.name for index in table.indexes}
+        for name in SUPERSEDED_INDEXES.get(table.name, []):
+            if name in existing and name not in declared:
+                print(f"🗑️ Dropping superseded {name} on {table.name}...")
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                dropped += 1
+
+    print(f"✅ Created {created} indexes, dropped {dropped}")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    add_missing_indexes()
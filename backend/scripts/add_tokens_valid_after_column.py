@@ -0,0 +1,37 @@
+"""
+Migration: Add tokens_valid_after column to users table
+
+create_all() creates the new refresh_tokens and revoked_tokens tables on
+startup, but it never alters an existing table, so databases created before
+token revocation need this column added once. Safe to run repeatedly.
+
+Run with: python -m scripts.add_tokens_valid_after_column
+"""
+from app.database import engine
+from sqlalchemy import inspect, text
+
+def add_tokens_valid_after_column():
+    """Add tokens_valid_after column to users table if it doesn't exist."""
+
+    print("\n" + "="*60)
+    print("🔧 MIGRATION: Adding tokens_valid_after column to users table")
+    print("="*60)
+
+    # ✅ inspect() works on both PostgreSQL and SQLite
+    columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    if "tokens_valid_after" in columns:
+        print("✅ Column 'tokens_valid_after' already exists")
+        print("="*60 + "\n")
+        return
+
+    with engine.connect() as conn:
+        # Nullable, no default: existing tokens stay valid until a password change
+        print("📝 Adding 'tokens_valid_after' column...")
+        conn.execute(text("ALTER TABLE users ADD COLUMN tokens_valid_after TIMESTAMP"))
+        conn.commit()
+
+    print("✅ Migration complete!")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    add_tokens_valid_after_column()
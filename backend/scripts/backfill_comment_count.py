@@ -0,0 +1,46 @@
+"""
+Migration + repair: recompute poems.comment_count from the comments table.
+Adds the column first if it doesn't exist yet.
+Run with: python -m scripts.backfill_comment_count
+"""
+from sqlalchemy import inspect, text
+from app.database import engine
+
+def ensure_comment_count_column():
+    """Add comment_count to poems if it doesn't exist."""
+    columns = {column["name"] for column in inspect(engine).get_columns("poems")}
+    if "comment_count" in columns:
+        print("✅ Column 'comment_count' already exists")
+        return
+    
+    print("📝 Adding 'comment_count' column...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE poems ADD COLUMN comment_count INTEGER DEFAULT 0"))
+    print("✅ Column added")
+
+def backfill_comment_count():
+    """Recompute every poem's comment_count with a single bulk UPDATE."""
+    
+    print("\n" + "="*60)
+    print("🔧 BACKFILL: poems.comment_count")
+    print("="*60)
+    
+    ensure_comment_count_column()
+    
+    # Only rows whose stored count is wrong are rewritten
+    with engine.begin() as conn:
+        result = conn.execute(text("""
+            UPDATE poems
+            SET comment_count = (
+                SELECT COUNT(*) FROM comments WHERE comments.poem_id = poems.id
+            )
+            WHERE COALESCE(comment_count, -1) != (
+                SELECT COUNT(*) FROM comments WHERE comments.poem_id = poems.id
+            )
+        """))
+    
+    print(f"✅ Repaired comment_count on {result.rowcount} poems")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    backfill_comment_count()
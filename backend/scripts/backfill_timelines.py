@@ -0,0 +1,37 @@
+"""
+Backfill fan-out home timelines for poems created before timelines existed.
+Run with: python -m scripts.backfill_timelines
+"""
+from app.database import SessionLocal
+from app.models import User
+from app.utils.timeline import backfill_author, get_friend_ids
+
+def backfill_timelines():
+    """Seed every user's timeline with their own and their friends' recent poems."""
+    db = SessionLocal()
+    
+    try:
+        print("\n" + "="*60)
+        print("🧵 BACKFILLING HOME TIMELINES")
+        print("="*60)
+        
+        total = 0
+        user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        for user_id in user_ids:
+            added = backfill_author(db, user_id, user_id)
+            for friend_id in get_friend_ids(db, user_id):
+                added += backfill_author(db, user_id, friend_id)
+            total += added
+            print(f"  ✓ user {user_id}: {added} entries")
+        
+        print(f"\n✅ Added {total} timeline entries for {len(user_ids)} users")
+        print("="*60 + "\n")
+        
+    except Exception as e:
+        print(f"\n❌ Error backfilling timelines: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_timelines()
@@ -0,0 +1,24 @@
+"""
+Rebuild trending scores (poem_scores) from stored like and comment counts.
+Use after first deploying trending or to reset drifted scores.
+Run with: python -m scripts.rebuild_trending
+"""
+from app.database import SessionLocal
+from app.utils.trending import rebuild_scores
+
+def rebuild_trending():
+    print("\n" + "="*60)
+    print("🔥 REBUILD: trending scores")
+    print("="*60)
+    
+    db = SessionLocal()
+    try:
+        total = rebuild_scores(db)
+    finally:
+        db.close()
+    
+    print(f"✅ Scored {total} public poems")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    rebuild_trending()
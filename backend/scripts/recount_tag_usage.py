@@ -0,0 +1,23 @@
+"""
+Repair: recompute tags.usage_count from poem_tags with one bulk UPDATE.
+Run with: python -m scripts.recount_tag_usage
+"""
+from app.database import SessionLocal
+from app.utils.tag_catalog import recount_usage
+
+def recount_tag_usage():
+    print("\n" + "="*60)
+    print("🔧 REPAIR: tags.usage_count")
+    print("="*60)
+    
+    db = SessionLocal()
+    try:
+        changed = recount_usage(db)
+    finally:
+        db.close()
+    
+    print(f"✅ Repaired usage_count on {changed} tags")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    recount_tag_usage()
@@ -4,6 +4,9 @@
   let currentChatUser = null;
   let chatModal = null;
   let messageCheckInterval = null;
+  let chatSocket = null;
+  let reconnectTimer = null;
+  let renderedMessageIds = new Set();
   
   // Create chat modal
   function createChatModal() {
@@ -63,8 +66,8 @@
     // Load messages
     await loadMessages();
     
-    // Start polling for new messages
-    startMessagePolling();
+    // Listen for new messages (falls back to polling if the socket is unavailable)
+    connectChatSocket();
     
     console.log('✅ Chat opened successfully');
   };
@@ -77,6 +80,68 @@
       document.body.style.overflow = 'auto';
       currentChatUser = null;
       stopMessagePolling();
+      disconnectChatSocket();
+    }
+  }
+  
+  function getMyUsername() {
+    const stored = JSON.parse(localStorage.getItem('rhymebox_user') || 'null');
+    return stored?.username || 'guest';
+  }
+  
+  function renderMessage(msg, myUsername) {
+    const isMe = msg.sender === myUsername;
+    const time = new Date(msg.created_at).toLocaleTimeString('en-US', { 
+      hour: 'numeric', 
+      minute: '2-digit' 
+    });
+    
+    return `
+      <div class="chat-message ${isMe ? 'mine' : 'theirs'}">
+        <div class="message-bubble">
+          <p>${msg.content}</p>
+          <span class="message-time">${time}</span>
+        </div>
+      </div>
+    `;
+  }
+  
+  // Append a single message (from the socket or our own send) unless already shown
+  function appendMessage(msg) {
+    if (renderedMessageIds.has(msg.id)) return;
+    renderedMessageIds.add(msg.id);
+    
+    const messagesDiv = document.getElementById('chatMessages');
+    const empty = messagesDiv.querySelector('.chat-empty');
+    if (empty) empty.remove();
+    
+    messagesDiv.insertAdjacentHTML('beforeend', renderMessage(msg, getMyUsername()));
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+  }
+  
+  // Fetch only messages newer than the last one shown (polling / reconnect catch-up)
+  async function loadNewMessages() {
+    const token = localStorage.getItem('rhymebox_token');
+    if (!token || !currentChatUser) return;
+    
+    const lastId = Math.max(0, ...renderedMessageIds);
+    if (!lastId) {
+      await loadMessages();
+      return;
+    }
+    
+    try {
+      const chatUser = currentChatUser;
+      const response = await fetch(`/api/friends/chat/${chatUser}?since_id=${lastId}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) throw new Error('Failed to load new messages');
+      
+      const messages = await response.json();
+      if (chatUser !== currentChatUser) return;
+      messages.forEach(appendMessage);
+    } catch (error) {
+      console.error('❌ Load new messages error:', error);
     }
   }
   
@@ -103,8 +168,8 @@
       const messages = await response.json();
       console.log(`✅ Loaded ${messages.length} messages`);
       
-      const stored = JSON.parse(localStorage.getItem('rhymebox_user') || 'null');
-      const myUsername = stored?.username || 'guest';
+      const myUsername = getMyUsername();
+      renderedMessageIds = new Set(messages.map(msg => msg.id));
       
       if (messages.length === 0) {
         messagesDiv.innerHTML = `
@@ -113,22 +178,7 @@
           </div>
         `;
       } else {
-        messagesDiv.innerHTML = messages.map(msg => {
-          const isMe = msg.sender === myUsername;
-          const time = new Date(msg.created_at).toLocaleTimeString('en-US', { 
-            hour: 'numeric', 
-            minute: '2-digit' 
-          });
-          
-          return `
-            <div class="chat-message ${isMe ? 'mine' : 'theirs'}">
-              <div class="message-bubble">
-                <p>${msg.content}</p>
-                <span class="message-time">${time}</span>
-              </div>
-            </div>
-          `;
-        }).join('');
+        messagesDiv.innerHTML = messages.map(msg => renderMessage(msg, myUsername)).join('');
         
         // Scroll to bottom
         messagesDiv.scrollTop = messagesDiv.scrollHeight;
@@ -174,14 +224,15 @@
         throw new Error('Failed to send message');
       }
       
+      const sent = await response.json();
       console.log('✅ Message sent');
       
       // Clear input
       input.value = '';
       input.style.height = 'auto';
       
-      // Reload messages
-      await loadMessages();
+      // Show it right away (the socket echo is de-duplicated by id)
+      appendMessage(sent);
       
     } catch (error) {
       console.error('❌ Send message error:', error);
@@ -189,13 +240,68 @@
     }
   }
   
-  // Start polling for new messages
+  // Open the real-time chat socket; new messages are pushed by the server
+  function connectChatSocket() {
+    const token = localStorage.getItem('rhymebox_token');
+    if (!token || !('WebSocket' in window)) {
+      startMessagePolling();
+      return;
+    }
+    if (chatSocket) return;
+    
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/api/friends/ws?token=${encodeURIComponent(token)}`);
+    chatSocket = socket;
+    
+    socket.onopen = () => {
+      console.log('🔌 Chat socket connected');
+      stopMessagePolling();
+      // Pick up anything sent while we were disconnected
+      loadNewMessages();
+    };
+    
+    socket.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
+      if (msg.type !== 'message' || !currentChatUser) return;
+      // Only messages belonging to the open conversation
+      if (msg.sender === currentChatUser || msg.receiver === currentChatUser) {
+        appendMessage(msg);
+      }
+    };
+    
+    socket.onclose = () => {
+      if (chatSocket !== socket) return;
+      chatSocket = null;
+      if (!currentChatUser) return;
+      
+      console.warn('⚠️ Chat socket closed, falling back to polling');
+      startMessagePolling();
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        if (currentChatUser) connectChatSocket();
+      }, 10000);
+    };
+  }
+  
+  function disconnectChatSocket() {
+    if (reconnectTimer) {
+      clearTimeout(reconnectTimer);
+      reconnectTimer = null;
+    }
+    if (chatSocket) {
+      const socket = chatSocket;
+      chatSocket = null;
+      socket.close();
+    }
+  }
+  
+  // Start polling for new messages (fallback when the socket is down)
   function startMessagePolling() {
     stopMessagePolling();
     console.log('⏰ Starting message polling (3s interval)');
     messageCheckInterval = setInterval(() => {
       if (currentChatUser) {
-        loadMessages();
+        loadNewMessages();
       }
     }, 3000);
   }
@@ -254,6 +360,7 @@
   // Cleanup on page unload
   window.addEventListener('beforeunload', () => {
     stopMessagePolling();
+    disconnectChatSocket();
   });
   
   console.log('✅ Chat module initialized, window.openChat is available');
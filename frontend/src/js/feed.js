@@ -139,25 +139,33 @@ document.addEventListener('DOMContentLoaded', async function(){
     });
   }
   
-  // ✅ NEW: Load initial like counts for each poem
+  // ✅ Load like counts + liked flags for all poems in one batch request
   async function loadLikeCounts(poems) {
     const token = localStorage.getItem('rhymebox_token');
-    if (!token) return;
+    if (!token || poems.length === 0) return;
     
-    for (const poem of poems) {
-      try {
-        const response = await fetch(`/api/poems/${poem.id}/likes`, {
-          headers: { 'Authorization': `Bearer ${token}` }
-        });
-        
-        if (response.ok) {
-          const data = await response.json();
-          poem.like_count = data.like_count;
-          poem.user_liked = data.user_liked || false;
+    try {
+      const response = await fetch('/api/poems/likes/batch', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`
+        },
+        body: JSON.stringify({ poem_ids: poems.map(p => p.id) })
+      });
+    
+      if (response.ok) {
+        const { likes } = await response.json();
+        for (const poem of poems) {
+          const data = likes[poem.id];
+          if (data) {
+            poem.like_count = data.like_count;
+            poem.user_liked = data.user_liked || false;
+          }
         }
-      } catch (error) {
-        console.warn(`Failed to load likes for poem ${poem.id}`);
       }
+    } catch (error) {
+      console.warn('Failed to load like status for feed');
     }
   }
   
@@ -267,28 +275,32 @@ document.addEventListener('DOMContentLoaded', async function(){
     });
   }
   
-  // ✅ NEW: Load comments
-  async function loadComments(poemId) {
+  // ✅ Load comments one page at a time (pass a cursor to append older ones)
+  async function loadComments(poemId, cursor = null) {
     const container = document.getElementById('commentsContainer');
     const token = localStorage.getItem('rhymebox_token');
     
     try {
-      const response = await fetch(`/api/poems/${poemId}/comments`, {
+      const params = new URLSearchParams({ limit: 20 });
+      if (cursor) params.set('cursor', cursor);
+      
+      const response = await fetch(`/api/poems/${poemId}/comments?${params}`, {
         headers: token ? { 'Authorization': `Bearer ${token}` } : {}
       });
       
       if (!response.ok) throw new Error('Failed to load comments');
       
-      const comments = await response.json();
+      const page = await response.json();
+      const comments = page.comments;
       const stored = JSON.parse(localStorage.getItem('rhymebox_user') || 'null');
       const myUsername = stored?.username;
       
-      if (comments.length === 0) {
+      if (!cursor && comments.length === 0) {
         container.innerHTML = '<p style="text-align:center;color:var(--muted);padding:20px;">No comments yet. Be the first!</p>';
         return;
       }
       
-      container.innerHTML = comments.map(c => {
+      const commentsHTML = comments.map(c => {
         const isOwn = c.author.replace('@', '') === myUsername;
         const deleteBtn = isOwn ? `<button class="btn-delete-comment" data-id="${c.id}" style="background:transparent;border:none;color:#e53935;cursor:pointer;font-size:0.9rem;padding:4px;">Delete</button>` : '';
         
@@ -309,8 +321,22 @@ document.addEventListener('DOMContentLoaded', async function(){
         `;
       }).join('');
       
+      container.querySelector('.btn-more-comments')?.remove();
+      if (cursor) {
+        container.insertAdjacentHTML('beforeend', commentsHTML);
+      } else {
+        container.innerHTML = commentsHTML;
+      }
+      
+      // Older comments are fetched on demand
+      if (page.has_more) {
+        container.insertAdjacentHTML('beforeend', `<button class="btn-more-comments" style="display:block;margin:12px auto;background:transparent;border:none;color:var(--muted);cursor:pointer;">Show older comments (${page.total - container.querySelectorAll('.comment-item').length} more)</button>`);
+        container.querySelector('.btn-more-comments').addEventListener('click', () => loadComments(poemId, page.next_cursor));
+      }
+      
       // Attach delete handlers
-      container.querySelectorAll('.btn-delete-comment').forEach(btn => {
+      container.querySelectorAll('.btn-delete-comment:not([data-bound])').forEach(btn => {
+        btn.dataset.bound = 'true';
         btn.addEventListener('click', async function() {
           const commentId = this.dataset.id;
           
@@ -399,7 +425,7 @@ document.addEventListener('DOMContentLoaded', async function(){
             ${likeIcon} <span class="like-count">${likeCount}</span>
           </button>
           <button class="btn-comment" data-id="${p.id}" data-title="${p.title || 'Untitled'}" style="background:transparent;border:none;color:var(--muted);cursor:pointer;display:flex;align-items:center;gap:4px;padding:4px 8px;border-radius:8px;transition:all 0.2s ease;">
-            💬 Comment
+            💬 <span class="comment-count">${p.comment_count || 0}</span>
           </button>
         </div>
       `;
@@ -436,6 +462,24 @@ document.addEventListener('DOMContentLoaded', async function(){
     });
   }
   
+  // ✅ Home timeline: one page of the fan-out store (like status already embedded)
+  async function loadTimeline() {
+    const token = localStorage.getItem('rhymebox_token');
+    if (!token) return null;
+    
+    try {
+      const response = await fetch('/api/poems/feed?limit=50', {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) return null;
+      const page = await response.json();
+      return page.poems;
+    } catch (error) {
+      console.warn('Failed to load home timeline, falling back to public feed');
+      return null;
+    }
+  }
+  
   // Initial load
   if (!feed) {
     console.error('Feed element not found!');
@@ -445,9 +489,14 @@ document.addEventListener('DOMContentLoaded', async function(){
   feed.innerHTML = '<p style="text-align:center;padding:40px 0;color:var(--muted);">Loading poems...</p>';
   
   try {
-    // ✅ Fetch poems
-    let poems;
-    if (window.DataPrefetch && window.DataPrefetch.cache.feed) {
+    // ✅ Fetch poems: the home timeline (yours + friends'), else the public feed
+    let poems = await loadTimeline();
+    const fromTimeline = Boolean(poems && poems.length > 0);
+    if (fromTimeline) {
+      console.log(`🏠 Showing home timeline: ${poems.length} poems`);
+      const subtitle = document.querySelector('.section-header p');
+      if (subtitle) subtitle.textContent = 'Poems from you and your friends';
+    } else if (window.DataPrefetch && window.DataPrefetch.cache.feed) {
       console.log('⚡ Using prefetched feed data');
       poems = window.DataPrefetch.cache.feed;
     } else {
@@ -473,8 +522,10 @@ document.addEventListener('DOMContentLoaded', async function(){
       }
     }
     
-    // ✅ Load like counts for all poems
-    await loadLikeCounts(poems);
+    // ✅ Load like counts for all poems (the timeline already includes them)
+    if (!fromTimeline) {
+      await loadLikeCounts(poems);
+    }
     
     allPoems = poems;
     renderPoems(allPoems);
@@ -170,7 +170,7 @@ document.addEventListener('DOMContentLoaded', function() {
       }
 
       const result = await response.json();
-      localStorage.setItem('rhymebox_token', result.access_token);
+      window.RhymeBoxSession.saveTokens(result);
 
       // Fetch user profile
       const profileResponse = await fetch('/api/profile/me', {
@@ -239,7 +239,7 @@ document.addEventListener('DOMContentLoaded', function() {
       }
       
       const result = await response.json();
-      localStorage.setItem('rhymebox_token', result.access_token);
+      window.RhymeBoxSession.saveTokens(result);
       localStorage.setItem('rhymebox_user', JSON.stringify({ 
         username: data.username,
         name: 'Rhymer'
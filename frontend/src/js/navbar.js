@@ -134,7 +134,7 @@
         e.preventDefault();
         const confirmed = await showLogoutConfirm();
         if (confirmed) {
-          localStorage.removeItem('rhymebox_token');
+          await window.RhymeBoxSession.logout();
           localStorage.removeItem('rhymebox_user');
           window.location.href = '/frontend/src/pages/login.html';
         }
@@ -349,7 +349,7 @@
         console.log('✅ Login successful, token received');
         
         // Save token
-        localStorage.setItem('rhymebox_token', result.access_token);
+        window.RhymeBoxSession.saveTokens(result);
         
         // Fetch user profile
         const profileResponse = await fetch('/api/profile/me', {
@@ -466,7 +466,7 @@
         const result = JSON.parse(responseText);
         console.log('✅ Signup successful:', result);
         
-        localStorage.setItem('rhymebox_token', result.access_token);
+        window.RhymeBoxSession.saveTokens(result);
         localStorage.setItem('rhymebox_user', JSON.stringify({ 
           username: data.username,
           name: data.name
@@ -0,0 +1,123 @@
+/**
+ * Session tokens for Rhyme Box
+ *
+ * Purpose: Keep the user signed in with short-lived access tokens
+ *
+ * - Access tokens expire after a few minutes; the refresh token (stored
+ *   alongside) is traded for a new pair at /api/auth/refresh
+ * - Wraps window.fetch: an API call that fails with 401 refreshes once
+ *   and is retried with the new token, so page scripts need no changes
+ * - Concurrent 401s share a single refresh request
+ *
+ * Usage: Include this script FIRST on every page that calls the API
+ * Example: <script src="/frontend/src/js/session.js"></script>
+ */
+
+(function() {
+  'use strict';
+
+  const TOKEN_KEY = 'rhymebox_token';
+  const REFRESH_KEY = 'rhymebox_refresh_token';
+
+  // Auth endpoints that must never trigger a refresh themselves
+  const NO_REFRESH_PATHS = ['/api/auth/token', '/api/auth/signup', '/api/auth/refresh', '/api/auth/logout'];
+
+  const originalFetch = window.fetch.bind(window);
+  let refreshPromise = null;
+
+  /**
+   * Store tokens from a login/signup/refresh/change-password response
+   */
+  function saveTokens(result) {
+    if (result.access_token) {
+      localStorage.setItem(TOKEN_KEY, result.access_token);
+    }
+    if (result.refresh_token) {
+      localStorage.setItem(REFRESH_KEY, result.refresh_token);
+    }
+  }
+
+  function clearTokens() {
+    localStorage.removeItem(TOKEN_KEY);
+    localStorage.removeItem(REFRESH_KEY);
+  }
+
+  /**
+   * Get a new access token. Resolves to the token, or null if the session is over.
+   */
+  function refresh() {
+    if (refreshPromise) return refreshPromise;
+
+    const refreshToken = localStorage.getItem(REFRESH_KEY);
+    if (!refreshToken) return Promise.resolve(null);
+
+    refreshPromise = originalFetch('/api/auth/refresh', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken })
+    })
+      .then(async (response) => {
+        if (!response.ok) {
+          console.warn('⚠️ Session expired, please log in again');
+          clearTokens();
+          return null;
+        }
+        const result = await response.json();
+        saveTokens(result);
+        console.log('🔄 Access token refreshed');
+        return result.access_token;
+      })
+      .catch((error) => {
+        console.error('❌ Token refresh failed:', error);
+        return null;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+
+    return refreshPromise;
+  }
+
+  /**
+   * Revoke this session on the server, then forget the tokens
+   */
+  async function logout() {
+    const token = localStorage.getItem(TOKEN_KEY);
+    const refreshToken = localStorage.getItem(REFRESH_KEY);
+    try {
+      if (token) {
+        const options = { method: 'POST', headers: { 'Authorization': `Bearer ${token}` } };
+        if (refreshToken) {
+          options.headers['Content-Type'] = 'application/json';
+          options.body = JSON.stringify({ refresh_token: refreshToken });
+        }
+        await originalFetch('/api/auth/logout', options);
+      }
+    } catch (error) {
+      console.warn('⚠️ Logout request failed:', error);
+    }
+    clearTokens();
+  }
+
+  // ✅ Retry API calls once after refreshing an expired access token
+  window.fetch = async function(input, init) {
+    const response = await originalFetch(input, init);
+    // Request objects may have a consumed body; page scripts pass URLs
+    if (response.status !== 401 || input instanceof Request) return response;
+
+    const path = new URL(String(input), window.location.origin).pathname;
+    const headers = new Headers((init && init.headers) || undefined);
+    if (!path.startsWith('/api/') || NO_REFRESH_PATHS.includes(path) || !headers.get('Authorization')) {
+      return response;
+    }
+
+    const newToken = await refresh();
+    if (!newToken) return response;
+
+    headers.set('Authorization', `Bearer ${newToken}`);
+    return originalFetch(input, { ...(init || {}), headers });
+  };
+
+  window.RhymeBoxSession = { saveTokens, clearTokens, refresh, logout };
+
+})();
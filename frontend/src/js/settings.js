@@ -108,7 +108,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         if (response.ok) {
           // Update token with new one
-          localStorage.setItem('rhymebox_token', data.access_token);
+          window.RhymeBoxSession.saveTokens(data);
           
           showToast('✅ Password changed successfully!', 'success');
           changePasswordForm.reset();